@@ -4,13 +4,16 @@ import os
 from pathlib import Path
 
 from fastapi import FastAPI, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from routers.logs import router as logs_router
 from routers.dashboard_api import router as dashboard_router
 from routers.mcp import router as mcp_router  # MCP 설정 전용 라우터 추가
-from routers.settings_api import router as settings_router  # 추가
+from routers.settings_api import router as settings_router, warm_up as warm_up_settings  # 추가
 from routers.auth_api import router as auth_router
+from db import init_db
 
 BASE_DIR = Path(__file__).resolve().parent
 DASHBOARD_DIR = BASE_DIR / "dashboard"  # index.html, app.js, vendor/*
@@ -19,8 +22,20 @@ DASHBOARD_DIR = BASE_DIR / "dashboard"  # index.html, app.js, vendor/*
 app = FastAPI(
     title="Sentinel Solution Server",
     version="2.2.0",
+    default_response_class=ORJSONResponse,  # 기본 JSON 응답은 orjson 으로 직렬화
 )
 
+# ---------- 응답 압축 ----------
+# 1KB 이상 응답만 gzip (작은 응답은 CPU 낭비라 그대로, Content-Encoding 이 이미 있으면 통과)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+# ---------- DB 스키마 준비 ----------
+# 라우터 import 마다 하던 create_all 대신 워커 시작 시 1회만 수행 (운영은 Alembic 권장)
+@app.on_event("startup")
+def _init_db_on_startup() -> None:
+    init_db()
+    warm_up_settings()  # 설정 스키마/검증기 선빌드 (첫 GET /settings 지연 방지)
+
 # ---------- 정적/대시보드 (SPA) ----------
 # /dashboard 경로에 정적 자산 + index.html 자동 서빙
 app.mount(
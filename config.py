@@ -29,6 +29,10 @@ class Settings(BaseSettings):
 
     DATABASE_URL: str = Field(default=DEFAULT_SQLITE_URL, description="SQLAlchemy Database URL")
 
+    # 커넥션 풀 (요청마다 새 연결을 맺지 않도록 스레드풀 동시성에 맞춰 여유 있게)
+    DB_POOL_SIZE: int = Field(default=20, description="상시 유지 커넥션 수")
+    DB_MAX_OVERFLOW: int = Field(default=20, description="순간 부하 시 추가로 허용할 커넥션 수")
+
     # 대시보드 요약 API 보호용 키
     # .env 예시: DASHBOARD_API_KEY="p4eHk9...랜덤..."
     DASHBOARD_API_KEY: str | None = Field(default=None)
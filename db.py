@@ -1,14 +1,59 @@
 # db.py
-from sqlalchemy import create_engine
+import logging
+import re
+
+import orjson
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
 
+logger = logging.getLogger(__name__)
+
+# stdlib json(ensure_ascii=True)이 \uXXXX 로 쓰는 문자: DEL + 비ASCII (JSON 출력에서는 문자열 리터럴 안에만 나옴)
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7e]")
+
+
+def _u_escape(m: "re.Match[str]") -> str:
+    # stdlib json(ensure_ascii=True)과 같은 소문자 \uXXXX, BMP 밖은 서로게이트 쌍
+    c = ord(m.group())
+    if c < 0x10000:
+        return "\\u%04x" % c
+    c -= 0x10000
+    return "\\u%04x\\u%04x" % (0xD800 | (c >> 10), 0xDC00 | (c & 0x3FF))
+
+
+def _json_dumps(obj) -> str:
+    # JSON 컬럼 직렬화: stdlib json 대신 orjson (dict 키가 문자열이 아니어도 허용)
+    # 기존 행(json.dumps 기본값)처럼 비ASCII 를 \uXXXX 로 이스케이프 → entities LIKE 검색이 신/구 행에서 동일하게 동작
+    s = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    if s.isascii() and "\x7f" not in s:
+        return s
+    return _NON_ASCII_RE.sub(_u_escape, s)
+
+
+def _pool_kwargs(url: str) -> dict:
+    # 인메모리 SQLite 는 단일 연결 풀(SingletonThreadPool)이라 풀 크기 옵션을 쓰지 않음
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:")):
+        return {}
+    return dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=False,  # 체크아웃마다 핑(SELECT 1) 하지 않음
+    )
+
+
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {},
+    **_pool_kwargs(settings.DATABASE_URL),
+    json_serializer=_json_dumps,
+    json_deserializer=orjson.loads,
     future=True,
 )
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+# expire_on_commit=False: 커밋 후에도 방금 쓴 값을 그대로 사용 (재조회 SELECT 없음)
+SessionLocal = sessionmaker(
+    bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, future=True
+)
 Base = declarative_base()
 
 def get_db():
@@ -20,4 +65,93 @@ def get_db():
         db.rollback()
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_db_ro():
+    """
+    조회 전용 세션: 성공 경로에서도 commit 하지 않고 rollback 으로 닫는다.
+    (쓰기가 필요한 경우는 호출 측에서 명시적으로 commit)
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.rollback()
+        db.close()
+
+
+def _existing_index_names(conn) -> set[str]:
+    """
+    DB 에 이미 있는 인덱스 이름.
+    SQLite 리플렉션(get_indexes)은 식(expression) 인덱스를 빼먹으므로 카탈로그를 이름으로 직접 조회
+    """
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        rows = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))
+    elif dialect == "postgresql":
+        rows = conn.execute(text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()"))
+    else:
+        insp = inspect(conn)
+        return {
+            ix["name"]
+            for t in insp.get_table_names()
+            for ix in insp.get_indexes(t)
+            if ix.get("name")
+        }
+    return {r[0] for r in rows}
+
+
+def _add_missing_columns() -> set[str]:
+    """
+    create_all 은 기존 테이블에 컬럼을 추가하지 않으므로,
+    모델에는 있는데 DB에는 없는 컬럼을 ALTER TABLE ... ADD COLUMN 으로 보강하고
+    모델에 선언된 인덱스 중 DB 에 없는 것(이름 기준)을 생성한다.
+    반환값: 컬럼이 추가된 테이블 이름 집합
+    """
+    insp = inspect(engine)
+    altered: set[str] = set()
+    with engine.begin() as conn:
+        index_names = _existing_index_names(conn)
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing:
+                    continue
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}'))
+                logger.info("[DB] added column %s.%s", table.name, col.name)
+                altered.add(table.name)
+            for idx in table.indexes:
+                # checkfirst 는 리플렉션 기반이라 SQLite 식 인덱스를 못 봄 → 이름으로 판단
+                if idx.name not in index_names:
+                    idx.create(conn)
+                    index_names.add(idx.name)
+    return altered
+
+
+def init_db() -> None:
+    """
+    테이블 생성 + 누락 컬럼/인덱스 보강 + 파생 컬럼 백필 (간이 마이그레이션).
+    운영에서는 Alembic 권장.
+    """
+    import models  # noqa: F401  (Base.metadata 에 테이블 등록)
+
+    insp = inspect(engine)
+    created = {t.name for t in Base.metadata.sorted_tables if not insp.has_table(t.name)}
+
+    Base.metadata.create_all(bind=engine)
+    altered = _add_missing_columns()
+
+    # 기존 log_records 에 파생 컬럼/테이블이 새로 생긴 경우에만 백필
+    log_table = models.LogRecord.__tablename__
+    derived_tables = {models.LogLabel.__tablename__}
+    if log_table not in created and (log_table in altered or created & derived_tables):
+        db = SessionLocal()
+        try:
+            n = models.LogRecord.backfill_derived(db)
+            logger.info("[DB] backfilled derived columns for %d log records", n)
+        finally:
+            db.close()
@@ -1,17 +1,97 @@
 # models.py
 from __future__ import annotations
 
-import json
+import ipaddress
+import re
 from datetime import datetime
-from typing import Any, Dict
+from functools import cached_property, lru_cache
+from typing import Any, Dict, Iterable
 
-from sqlalchemy import Column, String, Boolean, Integer, DateTime, JSON, Text
+import orjson
+
+from sqlalchemy import Column, String, Boolean, Integer, SmallInteger, DateTime, JSON, Text, ForeignKey, Index
+from sqlalchemy.orm import Session, relationship
 from sqlalchemy.sql import func
 from db import Base
 from datetime import datetime
 import secrets
 
 
+def entity_label_set(entities: Iterable[Dict[str, Any]] | None) -> frozenset[str]:
+    """엔티티 배열에서 라벨만 모아 대문자 frozenset으로 반환."""
+    return frozenset(
+        lab
+        for lab in ((e.get("label") or e.get("LABEL") or "").upper() for e in (entities or []))
+        if lab
+    )
+
+
+def ip_band16(ip: str | None) -> str | None:
+    """
+    IPv4 문자열(a.b.c.d)의 /16 대역 키("a.b.*")를 반환.
+    점이 정확히 3개가 아니면 None.
+    """
+    if not ip:
+        return None
+    p = ip.split(".", 3)
+    if len(p) != 4 or "." in p[3]:
+        return None
+    return f"{p[0]}.{p[1]}.*"
+
+
+# IPv4 형태 사전 검사 (형식이 아닌 값으로 ValueError 를 던지고 잡는 비용 회피)
+_IPV4_RE = re.compile(r"^(?:\d{1,3}\.){3}\d{1,3}$")
+
+
+@lru_cache(maxsize=4096)
+def ip_flags(ip: str) -> tuple[bool | None, bool | None]:
+    """
+    IP 문자열 → (is_global, is_private). IP 형식이 아니면 (None, None).
+    같은 PC/출구 IP 가 반복되므로 IP 별로 1회만 ip_address 객체를 만들어 판별.
+    """
+    # IPv6(":" 포함)만 예외 경로로 넘기고, 나머지는 IPv4 패턴이 아니면 바로 제외
+    if not ip or (":" not in ip and not _IPV4_RE.match(ip)):
+        return None, None
+    try:
+        obj = ipaddress.ip_address(ip)
+    except ValueError:
+        return None, None
+    return obj.is_global, obj.is_private
+
+
+def _attachment_dict(att: Any) -> Dict[str, Any] | None:
+    # attachment 컬럼 값(dict / JSON 문자열)을 dict 로, 아니면 None
+    if isinstance(att, str):
+        try:
+            att = orjson.loads(att)
+        except Exception:
+            return None
+    return att if isinstance(att, dict) else None
+
+
+def attachment_format_of(att: Any) -> str | None:
+    """
+    attachment({"format":..., "data":...})에서 소문자 확장자만 추출.
+    dict / JSON 문자열 모두 처리, 없으면 None.
+    """
+    att = _attachment_dict(att)
+    if att is None:
+        return None
+    fmt = str(att.get("format") or "").strip().lower()
+    return fmt[:16] or None
+
+
+def attachment_file_change_of(att: Any) -> bool:
+    """attachment.file_change 가 참(true / "true" / 1)인지."""
+    att = _attachment_dict(att)
+    if att is None:
+        return False
+    v = att.get("file_change")
+    if isinstance(v, str):
+        return v.strip().lower() in ("true", "1")
+    return bool(v)
+
+
 class LogRecord(Base):
     """
     한 레코드 = 에이전트 요청 + AI 판별 결과
@@ -31,6 +111,14 @@ class LogRecord(Base):
     attachment      = Column(JSON)     # {"format":..., "data":...} (운영에선 data 저장 지양)
     interface       = Column(String, default="llm")
 
+    # 집계용 파생 컬럼 (INSERT 시 fill_derived()로 1회 계산)
+    attachment_format = Column(String(16), index=True)   # attachment.format 소문자 (예: "pdf")
+    attachment_file_change = Column(Boolean, index=True) # attachment.file_change (민감 로그 필터용)
+    public_ip_band    = Column(String(16), index=True)   # 공인 IP /16 대역 (예: "221.111.*")
+    public_ip_is_global = Column(Boolean, index=True)    # 공인 IP 가 글로벌 주소인지 (IP 형식 아니면 NULL)
+    private_ip_band   = Column(String(16))               # 사설 IP /16 대역 (사설 대역일 때만)
+    private_ip_is_private = Column(Boolean, index=True)  # 사설 IP 가 사설 대역인지 (IP 형식 아니면 NULL)
+
     # 서버 결과
     modified_prompt = Column(Text, nullable=False)
     has_sensitive   = Column(Boolean, default=False, nullable=False)
@@ -44,6 +132,8 @@ class LogRecord(Base):
 
     # 메타
     created_at      = Column(DateTime(timezone=True), default=datetime.now, nullable=False)
+    created_hour    = Column(SmallInteger, index=True)   # created_at.hour (0~23)
+    created_date_ord = Column(Integer, index=True)       # created_at.toordinal() (일 단위 비교용)
 
     # Reason 페이지용 추가 정보
     reason = Column(Text, nullable=True)                # 한 줄 분석 결과
@@ -51,6 +141,101 @@ class LogRecord(Base):
     risk_category = Column(String(64), nullable=True)   # 예: "신원 정보 유출"
     risk_pattern = Column(String(128), nullable=True)   # 예: "NAME + PHONE + ADDRESS"
 
+    # entities 라벨 정규화 테이블 (검색/집계용, fill_derived()에서 채움)
+    labels = relationship("LogLabel", cascade="all, delete-orphan", passive_deletes=True)
+
+    @cached_property
+    def label_set(self) -> frozenset[str]:
+        """entities 라벨(대문자) 집합. 인스턴스당 1회만 계산해서 재사용."""
+        return entity_label_set(self.entities)
+
+    def fill_derived(self) -> None:
+        """
+        원본 컬럼에서 집계용 파생 컬럼을 계산해 채움.
+        (대시보드가 매 요청마다 JSON을 다시 파싱하지 않도록 INSERT 시 1회만 수행)
+        """
+        if self.created_at is None:
+            # 컬럼 default(datetime.now)는 flush 때 적용되므로 파생값 계산을 위해 미리 채움
+            self.created_at = datetime.now()
+        self.created_hour = self.created_at.hour
+        self.created_date_ord = self.created_at.toordinal()
+        self.attachment_format = attachment_format_of(self.attachment)
+        self.attachment_file_change = attachment_file_change_of(self.attachment)
+
+        pub = (self.public_ip or "").strip()
+        self.public_ip_band = ip_band16(pub)
+        self.public_ip_is_global = ip_flags(pub)[0]
+
+        priv = (self.private_ip or "").strip()
+        self.private_ip_is_private = ip_flags(priv)[1]
+        self.private_ip_band = ip_band16(priv) if self.private_ip_is_private else None
+
+        self.labels = [
+            LogLabel(label=str(e.get("label", "OTHER"))[:64])  # 기존 집계와 동일: 키가 없을 때만 OTHER
+            for e in (self.entities or [])
+            if isinstance(e, dict)
+        ]
+
+    @classmethod
+    def backfill_derived(cls, db: Session, chunk: int = 500) -> int:
+        """
+        파생 컬럼이 새로 추가된 기존 DB용: 전체 행을 PK 순으로 나눠 읽어 채움.
+        반환값: 처리한 행 수
+        """
+        last = ""
+        total = 0
+        while True:
+            rows = (
+                db.query(cls)
+                .filter(cls.request_id > last)
+                .order_by(cls.request_id)
+                .limit(chunk)
+                .all()
+            )
+            if not rows:
+                break
+            for r in rows:
+                r.fill_derived()
+            last = rows[-1].request_id
+            total += len(rows)
+            db.commit()
+        return total
+
+
+# 실제 쿼리 형태에 맞춘 인덱스 (기존 DB 는 init_db() 에서 이름으로 존재 여부 확인 후 생성)
+# - reason_top5 / reason_summary: has_sensitive=True + hostname
+Index("ix_logs_sensitive_hostname", LogRecord.has_sensitive, LogRecord.hostname)
+# - interface 필터(lower) + 최신순 정렬 (file-summary, dashboard ?interface=)
+Index("ix_logs_interface_created", func.lower(LogRecord.interface), LogRecord.created_at.desc())
+# - 최근 N건 (ORDER BY created_at DESC LIMIT N)
+Index("ix_logs_created_desc", LogRecord.created_at.desc())
+# - 파일 첨부 로그만 최신순 (부분 인덱스: Postgres / SQLite 3.8+)
+Index(
+    "ix_logs_attachment_created",
+    LogRecord.created_at.desc(),
+    postgresql_where=LogRecord.attachment_format.isnot(None),
+    sqlite_where=LogRecord.attachment_format.isnot(None),
+)
+
+
+class LogLabel(Base):
+    """
+    한 레코드 = LogRecord.entities 안의 엔티티 1개의 라벨
+
+    - JSON 컬럼을 문자열로 캐스팅해 LIKE 검색하지 않도록 라벨만 분리 저장
+    - 엔티티 개수만큼 행이 생기므로 라벨별 COUNT 가 대시보드 집계와 일치
+    """
+    __tablename__ = "log_labels"
+
+    id         = Column(Integer, primary_key=True, autoincrement=True)
+    request_id = Column(
+        String(64),
+        ForeignKey("log_records.request_id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    label      = Column(String(64), index=True, nullable=False)
+
 
 class McpConfigEntry(Base):
     """
@@ -125,9 +310,9 @@ class SettingsRecord(Base):
             return {}
         if isinstance(v, dict):
             return v
-        if isinstance(v, str):
+        if isinstance(v, (str, bytes)):
             try:
-                return json.loads(v) or {}
+                return orjson.loads(v) or {}
             except Exception:
                 return {}
         return {}
@@ -135,6 +320,7 @@ class SettingsRecord(Base):
     def set_config(self, cfg: Dict[str, Any]) -> None:
         """
         JSON 컬럼이므로 dict 그대로 저장.
+        (컬럼 직렬화는 엔진의 json_serializer=orjson 이 담당 → db.py)
         """
         self.config_json = cfg or {}
         self.updated_at = datetime.now()
@@ -5,6 +5,7 @@ from models import LogRecord
 class LogRepository:
     @staticmethod
     def create(db: Session, rec: LogRecord) -> LogRecord:
+        rec.fill_derived()
         db.add(rec)
         db.flush()
         return rec
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import os, base64, hashlib, hmac, secrets, logging
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Header, HTTPException, status
@@ -45,9 +46,10 @@ def verify_password(stored: str, pw: str) -> bool:
 def new_api_key() -> str:
     return secrets.token_urlsafe(48)
 
-def _admin_bypass_key() -> str:
-    # ✅ 런타임에서 읽기 (환경변수 핫스왑 가능)
-    return os.environ.get("ADMIN_KEY", "").strip()
+@lru_cache(maxsize=1)
+def _admin_bypass_key() -> bytes:
+    # ✅ 프로세스당 1회만 읽고 비교용 bytes 로 보관 (변경 시 재시작 필요)
+    return os.environ.get("ADMIN_KEY", "").strip().encode("utf-8")
 
 def _get_or_create_admin(db: Session) -> AdminAccountRecord:
     rec = db.get(AdminAccountRecord, 1)
@@ -79,17 +81,28 @@ def _get_or_create_admin(db: Session) -> AdminAccountRecord:
     db.flush()   # ✅ get_db()가 commit하므로 여기선 flush만
     return rec
 
+def _key_equals(given: bytes, expected: str | bytes) -> bool:
+    # 상수 시간 비교 (타이밍으로 키 길이/접두어 유추 방지)
+    if isinstance(expected, str):
+        expected = expected.encode("utf-8")
+    return hmac.compare_digest(given, expected)
+
 def require_admin(
     db: Session = Depends(get_db),
     x_admin_key: Optional[str] = Header(default=None, alias="X-Admin-Key"),
 ) -> AdminAccountRecord:
+    # 헤더가 없으면 DB 조회 없이 바로 거절
+    if not x_admin_key:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin key")
+    given = x_admin_key.encode("utf-8")
+
     # (선택) 운영 긴급 우회키
     bypass = _admin_bypass_key()
-    if bypass and x_admin_key == bypass:
+    if bypass and _key_equals(given, bypass):
         return _get_or_create_admin(db)
 
     rec = _get_or_create_admin(db)
-    if not x_admin_key or x_admin_key != rec.api_key:
+    if not rec.api_key or not _key_equals(given, rec.api_key):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin key")
     return rec
 
@@ -1,19 +1,23 @@
 # routers/dashboard_api.py
 from __future__ import annotations
 
-import json
+import hashlib
+import heapq
 import re
-import ipaddress
+import threading
+import time
+from functools import lru_cache
 from typing import Dict, List, Any
-from collections import defaultdict, Counter
+from collections import defaultdict, deque, Counter
 from datetime import datetime, date
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import cast, Text, func, or_  # JSON 검색 + interface 필터용
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import Text, bindparam, cast, func, or_, and_, case, select, lambda_stmt, tuple_  # interface 필터 + SQL 집계용
 
-from db import SessionLocal, Base, engine
-from models import LogRecord, McpConfigEntry
+from db import get_db  # ✅ 세션 DI 는 db 모듈 것을 공용으로 사용
+from models import LogRecord, LogLabel, McpConfigEntry, entity_label_set
 from config import settings
 from routers.auth_api import require_admin as require_admin_auth
 from services.reason_llm import infer_intent_with_llm
@@ -27,47 +31,64 @@ IP_URL_RE = re.compile(
     re.IGNORECASE,
 )
 
-# 운영에서는 Alembic 권장. 개발 편의를 위해 안전 생성.
-Base.metadata.create_all(bind=engine)
 
-def _parse_attachment(att) -> dict:
-    """
-    log_records.attachment 컬럼을 Python dict로 통일해서 리턴.
-    - DB에는 TEXT(JSON 문자열)로 들어가 있을 수도 있고
-    - SQLAlchemy에서 이미 dict로 올라올 수도 있으니 둘 다 처리.
-    """
-    if not att:
-        return {}
-
-    # 이미 dict인 경우 (SQLAlchemy JSON 타입 등)
-    if isinstance(att, dict):
-        return att or {}
-
-    # 문자열인 경우: JSON 디코드 후 dict일 때만 사용
-    if isinstance(att, str):
-        try:
-            obj = json.loads(att)
-            if isinstance(obj, dict):
-                return obj
-            else:
-                return {}
-        except Exception:
-            return {}
+@lru_cache(maxsize=4096)
+def _url_is_ip_based(url: str) -> bool:
+    """https://IP 형태 URL 여부. 같은 MCP 설정이 PC마다 반복되므로 URL 단위로 캐시."""
+    return bool(IP_URL_RE.search(url))
+
+# 목록/미리보기 응답에 필요한 컬럼만 로드 (attachment·modified_prompt 등 큰 컬럼 제외)
+_RECENT_COLUMNS = load_only(
+    LogRecord.created_at,
+    LogRecord.host,
+    LogRecord.hostname,
+    LogRecord.public_ip,
+    LogRecord.private_ip,
+    LogRecord.interface,
+    LogRecord.action,
+    LogRecord.allow,
+    LogRecord.has_sensitive,
+    LogRecord.file_blocked,
+    LogRecord.entities,
+    LogRecord.prompt,
+    LogRecord.attachment_format,
+    LogRecord.reason,
+)
 
-    # 그 외 타입은 전부 무시
-    return {}
+# 미리보기 길이: DB 에서 limit+1 자만 잘라 받으면 "…" 여부까지 판단 가능 (긴 프롬프트 전체 전송/디코딩 없음)
+_PREVIEW_LIMIT = 120
+
+# 대시보드 최근 목록용 컬럼 (ORM 객체 대신 Row 튜플로 바로 받음)
+_RECENT_ROW_COLUMNS = (
+    LogRecord.created_at,
+    LogRecord.host,
+    LogRecord.hostname,
+    LogRecord.public_ip,
+    LogRecord.private_ip,
+    LogRecord.action,
+    LogRecord.allow,
+    LogRecord.has_sensitive,
+    LogRecord.file_blocked,
+    LogRecord.entities,
+    func.substr(LogRecord.prompt, 1, _PREVIEW_LIMIT + 1).label("prompt"),
+    LogRecord.attachment_format,
+)
 
-# --- DB 세션 DI ---
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-        db.commit()
-    except Exception:
-        db.rollback()
-        raise
-    finally:
-        db.close()
+
+def _trunc(text: str | None, limit: int = _PREVIEW_LIMIT) -> str:
+    """프롬프트 미리보기: limit 자 초과 시 잘라서 "…" 붙임."""
+    if not text:
+        return ""
+    return text[:limit] + "…" if len(text) > limit else text
+
+
+# 차단 여부 (SQL 버전): allow=False 또는 action 이 "block" 으로 시작
+_BLOCKED_SQL = or_(LogRecord.allow.is_(False), LogRecord.action.like("block%"))
+
+
+def _sum_if(cond):
+    """SUM(CASE WHEN cond THEN 1 ELSE 0 END)"""
+    return func.sum(case((cond, 1), else_=0))
 
 
 # # --- 선택적 API 키 인증 ---
@@ -197,32 +218,42 @@ DANGEROUS_LABEL_COMBOS: List[List[str]] = [
     ["PHONE", "ADDRESS", "POSTAL_CODE"],
 ]
 
+# (frozenset, 원본 리스트) — 큰 조합부터 검사 (같은 크기는 선언 순서 유지)
+_COMBO_INDEX: List[tuple[frozenset[str], List[str]]] = sorted(
+    ((frozenset(c), c) for c in DANGEROUS_LABEL_COMBOS),
+    key=lambda x: -len(x[0]),
+)
+_MIN_COMBO = min(len(c) for c in DANGEROUS_LABEL_COMBOS)
+
 
-def _extract_label_set(entities: List[Dict[str, Any]]) -> set[str]:
-  """엔티티 배열에서 라벨만 모아 대문자 set으로 반환."""
-  labels: set[str] = set()
-  for e in entities or []:
-      lab = (e.get("label") or e.get("LABEL") or "").upper()
-      if lab:
-          labels.add(lab)
-  return labels
+def _extract_label_set(entities: List[Dict[str, Any]]) -> frozenset[str]:
+  """엔티티 배열에서 라벨만 모아 대문자 frozenset으로 반환."""
+  return entity_label_set(entities)
 
 
-def detect_combo_labels(entities: List[Dict[str, Any]]) -> List[str]:
+def detect_combo_labels(
+    entities: List[Dict[str, Any]],
+    labels: frozenset[str] | None = None,
+) -> List[str]:
   """
   사전에 정의한 라벨 조합이 있는지 확인해서,
   발견되면 그 콤보 라벨 리스트를 그대로 반환.
   없으면, 중요정보가 5개 이상이면 그 라벨 집합을 반환(복합 위협),
   그 외엔 빈 리스트.
+  labels: 이미 계산된 라벨 집합(LogRecord.label_set)이 있으면 재사용
   """
-  label_set = _extract_label_set(entities)
+  label_set = labels if labels is not None else _extract_label_set(entities)
   if not label_set:
       return []
 
-  # 3~4개짜리 사전 정의 조합 먼저 탐지
-  for combo in DANGEROUS_LABEL_COMBOS:
-      s = set(combo)
-      if s.issubset(label_set):
+  # 가장 작은 조합보다 라벨 수가 적으면 사전 정의 조합은 매칭 불가
+  # (5개 이상 규칙도 해당 없음)
+  if len(label_set) < _MIN_COMBO:
+      return []
+
+  # 사전 정의 조합 탐지 (4개짜리 → 3개 → 2개 순)
+  for s, combo in _COMBO_INDEX:
+      if s <= label_set:
           # 프론트에서 rule.labels와 정확히 비교하므로
           # 콤보에 들어있는 라벨만 그대로 넘겨준다.
           return combo
@@ -234,17 +265,17 @@ def detect_combo_labels(entities: List[Dict[str, Any]]) -> List[str]:
   return []
 
 
-def classify_risk_from_entities(entities: List[Dict[str, Any]]) -> Dict[str, str]:
+def classify_risk_from_entities(
+    entities: List[Dict[str, Any]],
+    labels: frozenset[str] | None = None,
+) -> Dict[str, str]:
     """
     엔티티 라벨 조합으로 위험 카테고리/패턴/설명을 판별.
     매칭이 없으면 '기타' 또는 '복합 정보 결합 위협'으로 분류.
+    labels: 이미 계산된 라벨 집합(LogRecord.label_set)이 있으면 재사용
     """
-    labels = {
-        (e.get("label") or "").upper()
-        for e in (entities or [])
-        if e.get("label")
-    }
-    labels = {lab for lab in labels if lab}
+    if labels is None:
+        labels = _extract_label_set(entities)
 
     # 정의된 패턴 우선 체크
     for pat in _RISK_PATTERNS:
@@ -271,7 +302,7 @@ def classify_risk_from_entities(entities: List[Dict[str, Any]]) -> Dict[str, str
     }
 
 
-_HIGH_INTENT_LABELS = {
+_HIGH_INTENT_LABELS = frozenset({
     "CARD_NUMBER",
     "CARD_CVV",
     "CARD_EXPIRY",
@@ -283,7 +314,19 @@ _HIGH_INTENT_LABELS = {
     "RESIDENT_ID",
     "PASSPORT",
     "DRIVER_LICENSE",
-}
+})
+
+
+@lru_cache(maxsize=1024)
+def _classify_label_set(labels: frozenset[str]) -> Dict[str, str]:
+    """라벨 집합별 위험 분류 결과 캐시 (같은 라벨 조합은 1회만 판별). 반환 dict 는 수정 금지."""
+    return classify_risk_from_entities([], labels=labels)
+
+
+@lru_cache(maxsize=1024)
+def _combo_for_label_set(labels: frozenset[str]) -> List[str]:
+    """라벨 집합별 위험 콤보 라벨 캐시. 반환 list 는 수정 금지."""
+    return detect_combo_labels([], labels=labels)
 
 
 def infer_intent_and_reason_from_context(
@@ -299,14 +342,9 @@ def infer_intent_and_reason_from_context(
         return "unknown", "맥락 로그가 부족하여 의도성을 판단하기 어렵습니다."
 
     target = context_logs[-1]
-    labels = {
-        (e.get("label") or "").upper()
-        for e in (target.entities or [])
-        if e.get("label")
-    }
 
     # 단순 휴리스틱: 고위험 라벨이 포함되어 있으면 'intentional'
-    if labels & _HIGH_INTENT_LABELS:
+    if target.label_set & _HIGH_INTENT_LABELS:
         intent = "intentional"
     else:
         intent = "negligent"
@@ -334,11 +372,11 @@ def infer_intent_and_reason_from_context(
     return intent, reason
 
 # ---------- 요약 API ----------
-@router.get("/summary", dependencies=[Depends(require_admin_auth)])
+@router.get("/summary", response_class=ORJSONResponse, dependencies=[Depends(require_admin_auth)])
 def dashboard_summary(
     interface: str | None = None,  # ?interface=LLM / MCP 등 필터
     db: Session = Depends(get_db),
-) -> Dict[str, Any]:
+) -> ORJSONResponse:
     """
     대시보드 요약 데이터:
     - total_sensitive: has_sensitive=True 총 건수
@@ -374,173 +412,178 @@ def dashboard_summary(
         q_interface = interface.strip().lower()
         query = query.filter(func.lower(LogRecord.interface) == q_interface)
 
-    rows: List[LogRecord] = query.order_by(LogRecord.created_at.desc()).all()
-
     # 오늘 날짜 (created_at 이 timezone-aware 라면 적절히 맞춰야 함)
     today: date = datetime.utcnow().date()
+    # 행마다 date 객체 비교 대신 정수(ordinal) 비교
+    today_ord = today.toordinal()
+    is_today_sql = LogRecord.created_date_ord == today_ord
+
+    # === SQL 집계 1: 호스트/시간대/확장자/대역 단위 카운트를 한 번의 스캔으로 ===
+    # (host, hour, ext, band) 조합별 SUM(CASE ...) 만 가져오고 Python 에서 각 지표로 접음.
+    # GROUPING SETS 는 SQLite 에 없으므로 조합 단위 조건부 집계로 대체
+    # (결과 행 수 = 실제 등장한 조합 수라 로그 수와 무관하게 작음)
+    host_key_sql = func.coalesce(func.nullif(LogRecord.host, ""), "unknown")
+    group_cols = (
+        host_key_sql,
+        LogRecord.created_hour,
+        LogRecord.attachment_format,
+        LogRecord.public_ip_band,
+    )
+    agg_rows = (
+        query.with_entities(
+            *group_cols,
+            func.count(),
+            _sum_if(LogRecord.has_sensitive.is_(True)),
+            _sum_if(_BLOCKED_SQL),
+            _sum_if(and_(is_today_sql, LogRecord.has_sensitive.is_(True))),
+            _sum_if(and_(is_today_sql, _BLOCKED_SQL)),
+        )
+        .group_by(*group_cols)
+        .all()
+    )
 
-    total_sensitive = 0
-    total_blocked = 0
-
-    type_ratio: Dict[str, int] = defaultdict(int)
-    type_detected: Dict[str, int] = defaultdict(int)
-
-    # 새로 추가된 "탐지" 집계
-    ip_band_detected: Dict[str, int] = defaultdict(int)
-
-    # 기존 "차단" 집계(호환 유지)
-    type_blocked: Dict[str, int] = defaultdict(int)
-    ip_band_blocked: Dict[str, int] = defaultdict(int)
-
-    # 서비스(호스트)별 집계
-    service_usage_by_host: Dict[str, int] = defaultdict(int)
-    service_sensitive_by_host: Dict[str, int] = defaultdict(int)
-    service_blocked_by_host: Dict[str, int] = defaultdict(int)
-
-    # 파일 기반 집계
-    file_detect_by_ext: Dict[str, int] = defaultdict(int)
-    file_label_by_ext: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
-    recent_file_logs: List[Dict[str, Any]] = []
-
-    # 오늘 기준 통계
-    today_sensitive = 0
-    today_blocked = 0
-    today_type_ratio: Dict[str, int] = defaultdict(int)
-
-    # 시간대별 통계
+    service_usage_by_host: Counter[str] = Counter()
+    service_sensitive_by_host: Counter[str] = Counter()
+    service_blocked_by_host: Counter[str] = Counter()
     hourly_attempts = [0] * 24                 # 전체 요청 수
     today_hourly = [0] * 24                    # 오늘 탐지 건수
-    hourly_type: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    file_detect_by_ext: Counter[str] = Counter()
+    ip_band_detected: Counter[str] = Counter()
+    ip_band_blocked: Counter[str] = Counter()
+    total_sensitive = total_blocked = today_sensitive = today_blocked = 0
+
+    for host_key, hour, file_ext, band, cnt, sens, blocked, t_sens, t_blocked in agg_rows:
+        sens, blocked = int(sens or 0), int(blocked or 0)
+        t_sens, t_blocked = int(t_sens or 0), int(t_blocked or 0)
+
+        # 서비스(호스트)별 + 전체 합계
+        service_usage_by_host[host_key] += cnt
+        total_sensitive += sens
+        total_blocked += blocked
+        today_sensitive += t_sens
+        today_blocked += t_blocked
+        if sens:
+            service_sensitive_by_host[host_key] += sens
+            # 확장자별 탐지 건수
+            if file_ext:
+                file_detect_by_ext[file_ext] += sens
+            # 공인IP /16 대역별 탐지 건수
+            if band:
+                ip_band_detected[band] += sens
+        if blocked:
+            service_blocked_by_host[host_key] += blocked
+            if band:
+                ip_band_blocked[band] += blocked
+
+        # 시간대별 시도 수 / 오늘 탐지 건수
+        if hour is not None:
+            hourly_attempts[hour] += cnt
+            today_hourly[hour] += t_sens
+
+    # === SQL 집계 5: 엔티티 라벨별 탐지 건수 (log_labels 조인, 엔티티 1개 = 1건) ===
+    # (시간대, 오늘 여부, 확장자, 라벨) 단위로 한 번에 세고 Python 에서 각 지표로 접음
+    type_ratio: Counter[str] = Counter()
+    today_type_ratio: Counter[str] = Counter()
+    hourly_type: List[Counter[str]] = [Counter() for _ in range(24)]
+    file_label_by_ext: Dict[str, Counter[str]] = defaultdict(Counter)
+
+    is_today_col = case((is_today_sql, 1), else_=0)
+    label_rows = (
+        query.join(LogRecord.labels)
+        .filter(LogRecord.has_sensitive.is_(True))
+        .with_entities(
+            LogRecord.created_hour,
+            is_today_col,
+            LogRecord.attachment_format,
+            LogLabel.label,
+            func.count(),
+        )
+        .group_by(LogRecord.created_hour, is_today_col, LogRecord.attachment_format, LogLabel.label)
+        .all()
+    )
+    for hour, today_flag, file_ext, label, cnt in label_rows:
+        type_ratio[label] += cnt
+        # 시간대별 유형 카운트
+        if hour is not None:
+            hourly_type[hour][label] += cnt
+        # 오늘 기준 유형 비율
+        if today_flag:
+            today_type_ratio[label] += cnt
+        # 파일 기반: 확장자+라벨별 카운트
+        if file_ext:
+            file_label_by_ext[file_ext][label] += cnt
+    # 유형별 탐지 횟수 = 전체 기간 라벨 카운트
+    type_detected = type_ratio
+
+    # === SQL 집계 6: 라벨별 차단 건수 (기존 로직 유지) ===
+    type_blocked: Dict[str, int] = dict(
+        query.join(LogRecord.labels)
+        .filter(_BLOCKED_SQL)
+        .with_entities(LogLabel.label, func.count())
+        .group_by(LogLabel.label)
+        .all()
+    )
+    # 파일 유사 차단인데 엔티티가 없을 때는 FILE_SIMILAR로 표기
+    file_similar = (
+        query.filter(_BLOCKED_SQL, LogRecord.file_blocked.is_(True), ~LogRecord.labels.any())
+        .with_entities(func.count())
+        .scalar()
+    )
+    if file_similar:
+        type_blocked["FILE_SIMILAR"] = type_blocked.get("FILE_SIMILAR", 0) + file_similar
 
-    recent_logs: List[Dict[str, Any]] = []
+    # === 최근 로그 20건 (민감값 미노출) — ORDER BY ... LIMIT 20 ===
+    recent_rows = (
+        query.with_entities(*_RECENT_ROW_COLUMNS)
+        .order_by(LogRecord.created_at.desc())
+        .limit(20)
+        .all()
+    )
+    recent_logs: List[Dict[str, Any]] = [
+        {
+            "time": r.created_at,  # datetime 그대로 → orjson 이 ISO 8601 로 직렬화
+            "host": r.host,
+            "hostname": r.hostname,
+            "public_ip": r.public_ip,
+            "private_ip": r.private_ip,
+            "internal_ip": r.private_ip,  # 대시보드 테이블에서 쓰는 필드
+            "action": r.action,
+            "has_sensitive": r.has_sensitive,
+            "file_blocked": r.file_blocked,
+            "entities": [{"label": (e.get("label") or "")} for e in (r.entities or [])],
+            "prompt": _trunc(r.prompt),
+        }
+        for r in recent_rows
+    ]
 
-    for r in rows:
-        created = r.created_at
-        created_date: date | None = created.date() if created else None
-        hour: int | None = created.hour if created else None
-
-        # ---- 서비스(호스트)별 공통 집계 ----
-        host_key = r.host or "unknown"
-        service_usage_by_host[host_key] += 1
-
-        # ---- 파일 관련 정보 파싱 (attachment.format) ----
-        file_ext: str | None = None
-        att = r.attachment
-        if att:
-            if isinstance(att, dict):
-                file_ext = (att.get("format") or "").strip().lower() or None
-            elif isinstance(att, str):
-                try:
-                    att_json = json.loads(att)
-                    file_ext = (att_json.get("format") or "").strip().lower() or None
-                except Exception:
-                    file_ext = None
-
-        # ---- 공통: 시간대별 "시도" 카운트 (모든 요청) ----
-        if hour is not None and 0 <= hour < 24:
-            try:
-                hourly_attempts[hour] += 1
-            except Exception:
-                pass
-
-        # ---- 차단 여부 미리 계산 ----
-        action = (r.action or "")
-        is_blocked = (r.allow is False) or action.startswith("block")
-
-        # === 탐지 관련 집계 ===
-        if r.has_sensitive:
-            total_sensitive += 1
-            service_sensitive_by_host[host_key] += 1
-
-            # 유형 비율/탐지 횟수: 엔티티 라벨 기준
-            for e in (r.entities or []):
-                label = e.get("label", "OTHER")
-                type_ratio[label] += 1
-                type_detected[label] += 1
-
-                # 시간대별 유형 카운트
-                if hour is not None and 0 <= hour < 24:
-                    hourly_type[hour][label] += 1
-
-                # 오늘 기준 유형 비율
-                if created_date == today:
-                    today_type_ratio[label] += 1
-
-                # 파일 기반: 확장자+라벨별 카운트
-                if file_ext:
-                    file_label_by_ext[file_ext][label] += 1
-
-            # /16 대역 탐지 건수
-            if r.public_ip and r.public_ip.count(".") == 3:
-                a, b, *_ = r.public_ip.split(".")
-                ip_band_detected[f"{a}.{b}.*"] += 1
-
-            # 오늘 탐지 건수 / 시간대별
-            if created_date == today and hour is not None and 0 <= hour < 24:
-                today_sensitive += 1
-                try:
-                    today_hourly[hour] += 1
-                except Exception:
-                    pass
-
-            # 파일 기반: 확장자별 탐지 건수
-            if file_ext:
-                file_detect_by_ext[file_ext] += 1
-
-        # === 차단 관련 집계(기존 로직 유지) ===
-        if is_blocked:
-            total_blocked += 1
-            service_blocked_by_host[host_key] += 1
-
-            if created_date == today:
-                today_blocked += 1
-
-            if r.entities:
-                for e in r.entities:
-                    type_blocked[e.get("label", "OTHER")] += 1
-            # 파일 유사 차단인데 엔티티가 없을 때는 FILE_SIMILAR로 표기
-            if r.file_blocked and not r.entities:
-                type_blocked["FILE_SIMILAR"] += 1
-
-            if r.public_ip and r.public_ip.count(".") == 3:
-                a, b, *_ = r.public_ip.split(".")
-                ip_band_blocked[f"{a}.{b}.*"] += 1
-
-        # === 최근 로그 20건 (민감값 미노출) ===
-        if len(recent_logs) < 20:
-            recent_logs.append({
-                "time": r.created_at.isoformat() if r.created_at else getattr(r, "time", None),
-                "host": r.host,
-                "hostname": r.hostname,
-                "public_ip": r.public_ip,
-                "private_ip": r.private_ip,
-                "internal_ip": r.private_ip,  # 대시보드 테이블에서 쓰는 필드
-                "action": r.action,
-                "has_sensitive": r.has_sensitive,
-                "file_blocked": r.file_blocked,
-                "entities": [{"label": (e.get("label") or "")} for e in (r.entities or [])],
-                "prompt": (r.prompt[:120] + "…") if r.prompt and len(r.prompt) > 120 else (r.prompt or ""),
-            })
-
-        # === 최근 파일 로그 20건 (첨부 있는 경우만) ===
-        if file_ext and len(recent_file_logs) < 20:
-            recent_file_logs.append({
-                "time": r.created_at.isoformat() if r.created_at else getattr(r, "time", None),
-                "host": r.host,
-                "hostname": r.hostname,
-                "public_ip": r.public_ip,
-                "private_ip": r.private_ip,
-                "internal_ip": r.private_ip,  # 대시보드 테이블에서 쓰는 필드
-                "action": r.action,
-                "has_sensitive": r.has_sensitive,
-                "file_blocked": r.file_blocked,
-                "blocked": is_blocked,
-                "file_ext": file_ext,
-            })
+    # === 최근 파일 로그 20건 (첨부 있는 경우만) ===
+    recent_file_rows = (
+        query.filter(LogRecord.attachment_format.isnot(None))
+        .with_entities(*_RECENT_ROW_COLUMNS)
+        .order_by(LogRecord.created_at.desc())
+        .limit(20)
+        .all()
+    )
+    recent_file_logs: List[Dict[str, Any]] = [
+        {
+            "time": r.created_at,
+            "host": r.host,
+            "hostname": r.hostname,
+            "public_ip": r.public_ip,
+            "private_ip": r.private_ip,
+            "internal_ip": r.private_ip,  # 대시보드 테이블에서 쓰는 필드
+            "action": r.action,
+            "has_sensitive": r.has_sensitive,
+            "file_blocked": r.file_blocked,
+            "blocked": (r.allow is False) or (r.action or "").startswith("block"),
+            "file_ext": r.attachment_format,
+        }
+        for r in recent_file_rows
+    ]
 
     # hourly_type 은 {시간(int): {라벨:카운트}} → JSON 직렬화 위해 키를 문자열로
     hourly_type_serialized: Dict[str, Dict[str, int]] = {
-        str(h): dict(type_counts) for h, type_counts in hourly_type.items()
+        str(h): dict(type_counts) for h, type_counts in enumerate(hourly_type) if type_counts
     }
 
     # file_label_by_ext 도 dict 로 변환
@@ -548,7 +591,7 @@ def dashboard_summary(
         ext: dict(label_counts) for ext, label_counts in file_label_by_ext.items()
     }
 
-    return {
+    return ORJSONResponse({
         # 전체 기간 통계
         "total_sensitive": total_sensitive,
         "total_blocked": total_blocked,
@@ -576,19 +619,99 @@ def dashboard_summary(
         "today_blocked": today_blocked,
         "today_hourly": today_hourly,
         "today_type_ratio": dict(today_type_ratio),
-    }
+    })
 
 
 # ---------- 전체 로그 조회 API (Logs 페이지용) ----------
-@router.get("/logs", dependencies=[Depends(require_admin_auth)])
+_LIKE = bindparam("like")
+
+# 검색 카테고리별 조건 (None = 검색어 없음, 알 수 없는 카테고리는 여러 컬럼 OR 검색)
+_LOG_SEARCH_CONDS = {
+    "prompt": LogRecord.prompt.ilike(_LIKE),
+    "host": LogRecord.host.ilike(_LIKE),
+    "pc_name": LogRecord.hostname.ilike(_LIKE),
+    "public_ip": LogRecord.public_ip.ilike(_LIKE),
+    "private_ip": LogRecord.private_ip.ilike(_LIKE),
+    # 엔티티 검색: 라벨은 log_labels(label 인덱스) 서브쿼리, 값은 기존처럼 JSON 텍스트 캐스팅 검색
+    "entity": or_(
+        LogRecord.request_id.in_(
+            select(LogLabel.request_id).where(LogLabel.label.ilike(_LIKE))
+        ),
+        cast(LogRecord.entities, Text).ilike(_LIKE),
+    ),
+}
+_LOG_SEARCH_ANY = or_(
+    LogRecord.prompt.ilike(_LIKE),
+    LogRecord.host.ilike(_LIKE),
+    LogRecord.hostname.ilike(_LIKE),
+    LogRecord.public_ip.ilike(_LIKE),
+    LogRecord.private_ip.ilike(_LIKE),
+)
+
+
+@lru_cache(maxsize=32)
+def _list_logs_stmts(cat: str | None, sensitive_only: bool, keyset: bool = False, tie: bool = False):
+    """
+    필터 조합(검색 카테고리 × 민감만 보기 × 커서 여부)별로 (페이지, 건수) 문장을 1회만 구성.
+    값은 전부 bindparam(like/offset/limit/before/before_id) → 요청마다 Select 체인 재구성 없이 파라미터만 바인딩.
+    keyset=True: (created_at, request_id) < (:before, :before_id) 범위 스캔 + LIMIT, OFFSET/전체 건수 없음.
+      같은 created_at 이 여러 건이어도 request_id 로 순서가 고정되어 페이지 경계에서 누락/중복 없음.
+      tie=False(before_id 없는 예전 커서)는 created_at < :before 만 사용.
+    """
+    conds = []
+    if cat is not None:
+        conds.append(_LOG_SEARCH_CONDS.get(cat, _LOG_SEARCH_ANY))
+
+    # ✅ 민감 로그만 보기 (has_sensitive=true OR attachment.file_change=true)
+    #    attachment JSON 을 문자열 LIKE 로 훑지 않고 INSERT 시 채운 파생 컬럼(인덱스) 사용
+    if sensitive_only:
+        conds.append(
+            or_(
+                LogRecord.has_sensitive.is_(True),
+                LogRecord.attachment_file_change.is_(True),
+            )
+        )
+
+    if keyset:
+        if tie:
+            cursor_cond = tuple_(LogRecord.created_at, LogRecord.request_id) < tuple_(
+                bindparam("before"), bindparam("before_id")
+            )
+        else:
+            cursor_cond = LogRecord.created_at < bindparam("before")
+        page_stmt = (
+            select(LogRecord)
+            .options(_RECENT_COLUMNS)
+            .where(*conds, cursor_cond)
+            .order_by(LogRecord.created_at.desc(), LogRecord.request_id.desc())
+            .limit(bindparam("limit"))
+        )
+        return page_stmt, None
+
+    page_stmt = (
+        select(LogRecord, func.count().over().label("_total"))
+        .options(_RECENT_COLUMNS)
+        .where(*conds)
+        # 커서 모드와 같은 전체 순서 → OFFSET 페이지의 next_before(_id) 로 이어 받아도 누락/중복 없음
+        .order_by(LogRecord.created_at.desc(), LogRecord.request_id.desc())
+        .offset(bindparam("offset"))
+        .limit(bindparam("limit"))
+    )
+    count_stmt = select(func.count()).select_from(LogRecord).where(*conds)
+    return page_stmt, count_stmt
+
+
+@router.get("/logs", response_class=ORJSONResponse, dependencies=[Depends(require_admin_auth)])
 def list_logs(
     page: int = 1,
     page_size: int = 20,
     q: str | None = None,
     category: str | None = None,
     sensitive_only: bool = False,   # ✅ 추가
+    before: datetime | None = None,
+    before_id: str | None = None,
     db: Session = Depends(get_db),
-) -> Dict[str, Any]:
+) -> ORJSONResponse:
     """
     Logs 페이지용 전체 로그 조회 API
 
@@ -598,6 +721,9 @@ def list_logs(
     - q: 검색 키워드
     - category: 검색 대상 컬럼
       - prompt | host | pc_name | public_ip | private_ip | entity
+    - before, before_id: 커서(이전 응답의 next_before / next_before_id).
+      주면 OFFSET 대신 (created_at, request_id) 기준 keyset 페이지
+      (page 무시, total 은 null — 무한 스크롤/내보내기용)
     """
     if page < 1:
         page = 1
@@ -606,68 +732,47 @@ def list_logs(
     if page_size > 500:
         page_size = 500
 
-    query = db.query(LogRecord)
-
-    # 검색 필터
+    cat = None
     if q:
-        like = f"%{q}%"
         cat = (category or "").lower()
+        if cat not in _LOG_SEARCH_CONDS:
+            cat = ""  # 카테고리 없음/알 수 없음 → 여러 컬럼 OR 검색 (캐시 키도 하나로)
+    page_stmt, count_stmt = _list_logs_stmts(
+        cat, sensitive_only, before is not None, before is not None and before_id is not None
+    )
+    params = {
+        "like": f"%{q}%",
+        "offset": (page - 1) * page_size,
+        "limit": page_size,
+        "before": before,
+        "before_id": before_id,
+    }
 
-        if cat == "prompt":
-            query = query.filter(LogRecord.prompt.ilike(like))
-        elif cat == "host":
-            query = query.filter(LogRecord.host.ilike(like))
-        elif cat == "pc_name":
-            query = query.filter(LogRecord.hostname.ilike(like))
-        elif cat == "public_ip":
-            query = query.filter(LogRecord.public_ip.ilike(like))
-        elif cat == "private_ip":
-            query = query.filter(LogRecord.private_ip.ilike(like))
-        elif cat == "entity":
-            # entities(JSON) 문자열 검색
-            query = query.filter(cast(LogRecord.entities, Text).ilike(like))
+    rows: List[LogRecord]
+    total: int | None
+    if before is not None:
+        rows = list(db.execute(page_stmt, params).scalars())
+        total = None
+    else:
+        # COUNT(*) OVER () 로 전체 건수와 페이지 행을 한 번의 쿼리로 가져옴
+        paged = db.execute(page_stmt, params).all()
+        if paged:
+            total = paged[0]._total
+        elif page > 1:
+            # 범위를 벗어난 페이지: 행이 없으니 건수만 별도로 조회
+            total = db.execute(count_stmt, params).scalar() or 0
         else:
-            # 카테고리 없으면 여러 컬럼 OR 검색
-            query = query.filter(
-                (LogRecord.prompt.ilike(like))
-                | (LogRecord.host.ilike(like))
-                | (LogRecord.hostname.ilike(like))
-                | (LogRecord.public_ip.ilike(like))
-                | (LogRecord.private_ip.ilike(like))
-            )
-
-    # ✅ 민감 로그만 보기 (has_sensitive=true OR attachment.file_change=true)
-    if sensitive_only:
-        att_text = cast(LogRecord.attachment, Text)
-
-        # 최소 수정 버전: attachment JSON을 문자열로 보고 file_change:true 패턴을 포함하면 매칭
-        file_change_true = or_(
-            att_text.ilike('%"file_change"%true%'),
-            att_text.ilike('%"file_change"%True%'),
-            att_text.ilike('%"file_change"%1%'),
-        )
-
-        query = query.filter(
-            or_(
-                LogRecord.has_sensitive.is_(True),
-                file_change_true,
-            )
-        )
-
-    query = query.order_by(LogRecord.created_at.desc())
-
-    total = query.count()
-    rows: List[LogRecord] = (
-        query.offset((page - 1) * page_size).limit(page_size).all()
-    )
+            total = 0
+        rows = [p.LogRecord for p in paged]
 
     items: List[Dict[str, Any]] = []
     for r in rows:
         items.append({
             "id": getattr(r, "request_id", None),
             "prompt": r.prompt,
-            "created_at": r.created_at.isoformat() if r.created_at else None,
-            "time": r.created_at.isoformat() if r.created_at else None,
+            # datetime 그대로 → ORJSONResponse(orjson)가 isoformat() 과 같은 ISO 8601 문자열로 직렬화
+            "created_at": r.created_at,
+            "time": r.created_at,
             "host": r.host,
             "hostname": r.hostname,
             "public_ip": r.public_ip,
@@ -681,14 +786,18 @@ def list_logs(
             "reason": getattr(r, "reason", None),
         })
 
-    return {
+    has_next = len(rows) == page_size
+    return ORJSONResponse({
         "items": items,
         "total": total,
         "page": page,
         "page_size": page_size,
-    }
+        # 다음 페이지 커서 (마지막 행 created_at + request_id; 더 없으면 null)
+        "next_before": rows[-1].created_at.isoformat() if has_next else None,
+        "next_before_id": rows[-1].request_id if has_next else None,
+    })
 
-@router.get("/mcp/config_summary", dependencies=[Depends(require_admin_auth)])
+@router.get("/mcp/config_summary", response_class=ORJSONResponse, dependencies=[Depends(require_admin_auth)])
 def mcp_config_summary(db: Session = Depends(get_db)):
     """
     MCP 설정 파일 기반 CONFIG 리포트 요약
@@ -810,11 +919,9 @@ def mcp_config_summary(db: Session = Depends(get_db)):
             seen_keys.add(key)
 
         # 최신 순으로 10개만 타임라인에 노출
-        latest_snaps = sorted(
-            snaps.values(),
-            key=lambda x: (x["agent_time"] or ""),
-            reverse=True,
-        )[:10]
+        latest_snaps = heapq.nlargest(
+            10, snaps.values(), key=lambda x: (x["agent_time"] or "")
+        )
 
         for snap in latest_snaps:
             entries = snap["entries"]
@@ -854,7 +961,7 @@ def mcp_config_summary(db: Session = Depends(get_db)):
         url = (e.url or "").strip()
         if not url:
             continue
-        if IP_URL_RE.search(url):
+        if _url_is_ip_based(url):
             suspicious_entries.append(e)
 
     if suspicious_entries:
@@ -883,17 +990,17 @@ def mcp_config_summary(db: Session = Depends(get_db)):
             ),
         }
 
-    return {
+    return ORJSONResponse({
         "updated_at": datetime.utcnow().isoformat() + "Z",
         "active_total": active_total,
         "active_rank": active_rank,
         "type_distribution": type_dist,
         "timeline": timeline,
         "prediction": prediction,
-    }
+    })
 
-@router.get("/network/summary", dependencies=[Depends(require_admin_auth)])
-def network_summary(db: Session = Depends(get_db)) -> Dict[str, Any]:
+@router.get("/network/summary", response_class=ORJSONResponse, dependencies=[Depends(require_admin_auth)])
+def network_summary(db: Session = Depends(get_db)) -> ORJSONResponse:
     """
     네트워크 리포트(외부 IP / 사설망 / 의심 PC)용 요약 데이터.
 
@@ -904,149 +1011,112 @@ def network_summary(db: Session = Depends(get_db)) -> Dict[str, Any]:
     - suspicious_logs: 의심 PC 관련 로그 테이블용 레코드
     """
 
-    # 모든 로그 (추후 기간 필터링이 필요하면 여기서 where 조건 추가)
-    rows: List[LogRecord] = (
-        db.query(LogRecord)
-        .order_by(LogRecord.created_at.asc())
+    # 1) 공인 IP 대역 사용 현황 (PUBLIC 대역) — INSERT 시 계산된 public_ip_band 로 GROUP BY
+    # key: "A.B.*"  (/16 대역), 공인(글로벌) IP만 대상 (사설/루프백 등은 제외)
+    public_band_filter = (
+        LogRecord.public_ip_is_global.is_(True),
+        LogRecord.public_ip_band.isnot(None),
+    )
+    pc_key_sql = func.coalesce(func.nullif(func.trim(LogRecord.hostname), ""), "UNKNOWN")
+    band_rows = (
+        db.query(
+            LogRecord.public_ip_band,
+            func.count(),
+            _sum_if(LogRecord.has_sensitive.is_(True)),
+            func.count(func.distinct(pc_key_sql)),
+        )
+        .filter(*public_band_filter)
+        .group_by(LogRecord.public_ip_band)
         .all()
     )
+    public_band_usage: Dict[str, int] = {}
+    band_sensitive_count: Dict[str, int] = {}   # 중요정보 탐지 건수
+    band_pc_count: Dict[str, int] = {}          # 해당 대역 사용하는 PCName 수
+    for band, cnt, sens, pcs in band_rows:
+        public_band_usage[band] = cnt
+        band_sensitive_count[band] = int(sens or 0)
+        band_pc_count[band] = pcs
+
+    # 2) 공인 IP 대역별 연결 사설망 /16 대역 집합 (PRIVATE IP 가 사설 대역인 경우만)
+    band_private_bands: Dict[str, set] = defaultdict(set)
+    for band, priv_band in (
+        db.query(LogRecord.public_ip_band, LogRecord.private_ip_band)
+        .filter(*public_band_filter, LogRecord.private_ip_band.isnot(None))
+        .distinct()
+    ):
+        band_private_bands[band].add(priv_band)
+
+    # 3) 외부 IP 사용 의심 PC 판별 (SQL 조건)
+    #   (1) PUBLIC IP == PRIVATE IP          → 직접 인터넷 노출 (direct_exposure)
+    #   (2) PRIVATE IP 가 사설대역이 아님      → 신규 출구 (new_egress)
+    #       (INSERT 시 계산된 private_ip_is_private, IP 형식이 아니면 NULL 이라 제외)
+    pub_sql = func.coalesce(func.trim(LogRecord.public_ip), "")
+    priv_sql = func.coalesce(func.trim(LogRecord.private_ip), "")
+    direct_sql = and_(pub_sql != "", pub_sql == priv_sql)
+    suspicious_sql = or_(direct_sql, LogRecord.private_ip_is_private.is_(False))
+    reason_sql = case((direct_sql, "direct_exposure"), else_="new_egress")
+
+    # 카드용: (public_ip, private_ip, pc_name) 조합별 최신 시간, 최근순 최대 20개
+    last_time_sql = func.max(LogRecord.created_at)
+    suspicious_pcs: List[Dict[str, Any]] = [
+        {
+            "public_ip": pub,
+            "private_ip": priv,
+            "pc_name": pc_name,
+            "reason": reason,        # "direct_exposure" or "new_egress"
+            "last_time": last_time.isoformat() if last_time else "",
+        }
+        for pub, priv, pc_name, reason, last_time in (
+            db.query(pub_sql, priv_sql, pc_key_sql, reason_sql, last_time_sql)
+            .filter(suspicious_sql)
+            .group_by(pub_sql, priv_sql, pc_key_sql, reason_sql)
+            .order_by(last_time_sql.desc())
+            .limit(20)
+        )
+    ]
 
-    # 1) 공인 IP 대역 사용 현황 (PUBLIC 대역)
-    # key: "A.B.*"  (/16 대역)
-    public_band_usage: Dict[str, int] = defaultdict(int)
-
-    # 2) 공인 IP 대역별 연결 사설망 정보
-    band_private_bands: Dict[str, set] = defaultdict(set)   # 사설망 /16 대역 집합
-    band_pc_names: Dict[str, set] = defaultdict(set)        # 해당 대역 사용하는 PCName 집합
-    band_sensitive_count: Dict[str, int] = defaultdict(int) # 중요정보 탐지 건수
-
-    # 3) 외부 IP 사용 의심 PC 정보
-    # key = (public_ip, private_ip, pc_name)
-    suspicious_map: Dict[tuple, Dict[str, Any]] = {}
-
-    # 4) 의심 로그 목록 (테이블용)
-    suspicious_logs: List[Dict[str, Any]] = []
-
-    for r in rows:
-        pub = (r.public_ip or "").strip()
-        priv = (r.private_ip or "").strip()
-        pc_name = (r.hostname or "").strip() or "UNKNOWN"
-        created = r.created_at
-        created_str = created.isoformat() if created else (r.time or "")
-
-        # ---------- 공인 IP 대역 집계 (PUBLIC 대역 개수 / 대역폭 사용 현황) ----------
-        if pub:
-            try:
-                ip_obj = ipaddress.ip_address(pub)
-                # 공인 IP만 대상 (사설/루프백 등은 제외)
-                if ip_obj.is_global:
-                    octets = pub.split(".")
-                    if len(octets) == 4:
-                        band = f"{octets[0]}.{octets[1]}.*"
-                        public_band_usage[band] += 1
-
-                        # 이 PUBLIC 대역을 사용하는 사설망 대역 목록 (PRIVATE IP 기준)
-                        if priv:
-                            try:
-                                priv_obj = ipaddress.ip_address(priv)
-                                if priv_obj.is_private:
-                                    po = priv.split(".")
-                                    if len(po) == 4:
-                                        priv_band = f"{po[0]}.{po[1]}.*"
-                                        band_private_bands[band].add(priv_band)
-                            except ValueError:
-                                pass
-
-                        band_pc_names[band].add(pc_name)
-                        if r.has_sensitive:
-                            band_sensitive_count[band] += 1
-            except ValueError:
-                # 잘못된 IP 문자열은 무시
-                pass
-
-        # ---------- 외부 IP 사용 의심 PC 판별 ----------
-        reason = None
-
-        # (1) PUBLIC IP == PRIVATE IP  → 직접 인터넷 노출
-        if pub and priv and pub == priv:
-            reason = "direct_exposure"
-
-        # (2) PRIVATE IP가 사설대역이 아님 → 신규 출구
-        elif priv:
-            try:
-                priv_obj = ipaddress.ip_address(priv)
-                if not priv_obj.is_private:
-                    reason = "new_egress"
-            except ValueError:
-                # IP 형식이 아니면 무시
-                pass
-
-        if reason:
-            key = (pub, priv, pc_name)
-            prev = suspicious_map.get(key)
-            # 같은 조합이면 더 최근 시간으로 갱신
-            if not prev or prev["last_time"] < created_str:
-                suspicious_map[key] = {
-                    "public_ip": pub,
-                    "private_ip": priv,
-                    "pc_name": pc_name,
-                    "reason": reason,        # "direct_exposure" or "new_egress"
-                    "last_time": created_str,
-                }
-
-            # 이 로그도 "외부 IP 사용 의심 PC 로그" 테이블에 포함
-            suspicious_logs.append({
-                "time": created_str,
-                "host": r.host,
-                "pc_name": pc_name,
-                "public_ip": pub,
-                "private_ip": priv,
-                "interface": r.interface,
-                "action": r.action,
-                "allow": r.allow,
-                "has_sensitive": r.has_sensitive,
-                "file_blocked": r.file_blocked,
-                "entities": r.entities or [],
-                "prompt": (
-                    (r.prompt[:120] + "…")
-                    if r.prompt and len(r.prompt) > 120
-                    else (r.prompt or "")
-                ),
-            })
+    # 4) "외부 IP 사용 의심 PC 로그" 테이블: 최신순 50개
+    suspicious_rows: List[LogRecord] = (
+        db.query(LogRecord)
+        .options(_RECENT_COLUMNS)
+        .filter(suspicious_sql)
+        .order_by(LogRecord.created_at.desc())
+        .limit(50)
+        .all()
+    )
+    suspicious_logs: List[Dict[str, Any]] = [
+        {
+            "time": r.created_at or (r.time or ""),
+            "host": r.host,
+            "pc_name": (r.hostname or "").strip() or "UNKNOWN",
+            "public_ip": (r.public_ip or "").strip(),
+            "private_ip": (r.private_ip or "").strip(),
+            "interface": r.interface,
+            "action": r.action,
+            "allow": r.allow,
+            "has_sensitive": r.has_sensitive,
+            "file_blocked": r.file_blocked,
+            "entities": r.entities or [],
+            "prompt": _trunc(r.prompt),
+        }
+        for r in suspicious_rows
+    ]
 
     # ---------- 대역폭 별 연결 사설망 (상위 3개) ----------
-    band_items: List[Dict[str, Any]] = []
-    for band, cnt in public_band_usage.items():
+    # 사용량 기준 상위 3개 대역만 골라서(전체 정렬 없이) 카드용 항목 생성
+    top_private_bands: List[Dict[str, Any]] = []
+    for band, cnt in heapq.nlargest(3, public_band_usage.items(), key=lambda kv: kv[1]):
         priv_bands = sorted(band_private_bands.get(band, []))
-        band_items.append({
+        top_private_bands.append({
             "public_band": band,                         # 예: "221.111.*"
             "total_logs": cnt,                           # 이 PUBLIC 대역으로 나간 전체 로그 수
             "private_band_count": len(priv_bands),       # 연결된 사설망 /16 대역 수
             "private_bands": priv_bands,                 # ["192.168.*", "172.16.*", ...]
-            "pc_count": len(band_pc_names.get(band, [])),
+            "pc_count": band_pc_count.get(band, 0),
             "sensitive_count": band_sensitive_count.get(band, 0),
         })
 
-    # 사용량 기준 내림차순 정렬 후 상위 3개만 카드용으로 사용
-    top_private_bands = sorted(
-        band_items, key=lambda x: x["total_logs"], reverse=True
-    )[:3]
-
-    # ---------- 외부 IP 사용 의심 PC 정보 (카드용) ----------
-    suspicious_pcs = sorted(
-        suspicious_map.values(),
-        key=lambda x: x["last_time"],
-        reverse=True,
-    )[:20]  # 카드에는 최대 20개만
-
-    # 로그 테이블도 최신순 50개로 제한
-    suspicious_logs = sorted(
-        suspicious_logs,
-        key=lambda x: x["time"],
-        reverse=True,
-    )[:50]
-
-    return {
+    return ORJSONResponse({
         # PUBLIC 대역 개수 카드 + PUBLIC 대역 파이 차트
         "public_band_usage": dict(public_band_usage),   # { "221.111.*": 10, ... }
         "public_band_count": len(public_band_usage),    # 예: 12
@@ -1060,10 +1130,35 @@ def network_summary(db: Session = Depends(get_db)) -> Dict[str, Any]:
 
         # 외부 IP 사용 의심 PC 로그 테이블
         "suspicious_logs": suspicious_logs,
-    }
+    })
+
+# ---------- 폴링용 결과 캐시 (MAX(created_at) 이 같으면 재사용) ----------
+_RESULT_TTL_SEC = 10.0
+_RESULT_CACHE: Dict[str, tuple[float, Any, Any]] = {}   # name -> (저장 시각, latest, 결과)
+_RESULT_CACHE_LOCK = threading.Lock()
+
+
+def _cached_by_latest(name: str, latest: Any, build) -> Any:
+    """
+    최신 로그 시각(latest)이 직전과 같고 TTL 이내면 캐시된 결과를 그대로 반환,
+    아니면 build() 로 다시 계산해서 저장. 반환값은 공유되므로 수정 금지.
+    """
+    now = time.monotonic()
+    with _RESULT_CACHE_LOCK:
+        hit = _RESULT_CACHE.get(name)
+    if hit and hit[1] == latest and now - hit[0] < _RESULT_TTL_SEC:
+        return hit[2]
+
+    value = build()
+    with _RESULT_CACHE_LOCK:
+        _RESULT_CACHE[name] = (now, latest, value)
+    return value
+
 
 @router.get("/report/llm/file-summary", dependencies=[Depends(require_admin_auth)])
 def report_llm_file_summary(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
     """
@@ -1072,68 +1167,96 @@ def report_llm_file_summary(
     - 확장자 x 라벨별 개수 (스택 바용)
     - 최근 20건 테이블
     을 반환
+
+    최신 LLM 로그 시각(MAX(created_at)) 기반 ETag 를 붙이고,
+    If-None-Match 가 같으면 집계 없이 304 를 반환 (대시보드 폴링용)
     """
+    # 폴링마다 실행되는 고정 형태 쿼리 → lambda_stmt 로 SQL 컴파일 결과 캐시
+    latest = db.execute(
+        lambda_stmt(
+            lambda: select(func.max(LogRecord.created_at))
+            .where(func.lower(LogRecord.interface) == "llm")
+        )
+    ).scalar()
+    etag = '"' + hashlib.blake2b(str(latest).encode(), digest_size=8).hexdigest() + '"'
+    cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=15"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (t.strip().removeprefix("W/") for t in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+    response.headers.update(cache_headers)
+
+    return _cached_by_latest(
+        "llm_file_summary", latest, lambda: _build_llm_file_summary(db)
+    )
 
-    # 1) 파일 첨부된 LLM 로그만 조회 (interface 소문자 기준으로 필터)
+
+def _build_llm_file_summary(db: Session) -> Dict[str, Any]:
+    """report_llm_file_summary 실제 집계 (캐시 미스일 때만 호출)."""
+    # 1) 파일 첨부된 LLM 로그만 대상 (interface 소문자 기준으로 필터)
     q = (
         db.query(LogRecord)
         .filter(func.lower(LogRecord.interface) == "llm")
         .filter(LogRecord.attachment.isnot(None))  # SQLite: IS NOT NULL
-        .order_by(LogRecord.created_at.desc())
     )
+    # 확장자: INSERT 시 계산된 attachment_format (없으면 "text")
+    ext_sql = func.coalesce(LogRecord.attachment_format, "text")
 
-    rows: List[LogRecord] = q.limit(200).all()
-
-    # 2) 도넛: 확장자별 개수
-    donut_counts: Dict[str, int] = defaultdict(int)
+    # 2) 도넛: 최근 200건 기준 확장자별 개수 (GROUP BY)
+    latest = (
+        q.with_entities(LogRecord.request_id, ext_sql.label("ext"))
+        .order_by(LogRecord.created_at.desc())
+        .limit(200)
+        .subquery()
+    )
+    donut_counts: Dict[str, int] = dict(
+        db.query(latest.c.ext, func.count()).group_by(latest.c.ext).all()
+    )
 
-    # 3) 스택 바: 확장자 x 라벨
-    stacked_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    # 3) 스택 바: 확장자 x 라벨 교차표 (최근 200건 x log_labels, GROUP BY)
+    label_sql = func.upper(LogLabel.label)
+    stacked_rows = (
+        db.query(latest.c.ext, label_sql, func.count())
+        .join(LogLabel, LogLabel.request_id == latest.c.request_id)
+        .group_by(latest.c.ext, label_sql)
+        .all()
+    )
+    stacked_counts: Dict[tuple[str, str], int] = {
+        (ext, lab): cnt for ext, lab, cnt in stacked_rows
+    }
 
     # 4) 테이블: 최근 20건
-    recent: List[Dict[str, Any]] = []
-
-    for r in rows:
-        # --- attachment 파싱 (TEXT/JSON → dict 통일) ---
-        att = _parse_attachment(r.attachment)
-        ext = (att.get("format") or "TEXT").strip().lower()
-
-        # 도넛 카운트
-        donut_counts[ext] += 1
-
-        # 엔티티 라벨 집계
-        for e in (r.entities or []):
-            lab = (e.get("label") or "OTHER").upper()
-            stacked_counts[ext][lab] += 1
-
-        # 최근 20건 테이블
-        if len(recent) < 20:
-            recent.append(
-                {
-                    "time": r.created_at.isoformat() if r.created_at else getattr(r, "time", None),
-                    "host": r.host,
-                    "pc_name": r.hostname,   # PC 이름
-                    "public_ip": r.public_ip,
-                    "private_ip": r.private_ip,
-                    "action": r.action,
-                    "has_sensitive": r.has_sensitive,
-                    "file_blocked": r.file_blocked,
-                    "file_ext": ext,
-                }
-            )
+    recent_rows: List[LogRecord] = (
+        q.options(_RECENT_COLUMNS)
+        .order_by(LogRecord.created_at.desc())
+        .limit(20)
+        .all()
+    )
+    recent: List[Dict[str, Any]] = [
+        {
+            "time": r.created_at.isoformat() if r.created_at else getattr(r, "time", None),
+            "host": r.host,
+            "pc_name": r.hostname,   # PC 이름
+            "public_ip": r.public_ip,
+            "private_ip": r.private_ip,
+            "action": r.action,
+            "has_sensitive": r.has_sensitive,
+            "file_blocked": r.file_blocked,
+            "file_ext": r.attachment_format or "text",
+        }
+        for r in recent_rows
+    ]
 
     # 차트용 구조 정리
     ext_labels = sorted(donut_counts.keys())
     donut_data = [donut_counts[e] for e in ext_labels]
 
-    all_entity_labels = sorted(
-        {lab for ext_map in stacked_counts.values() for lab in ext_map.keys()}
-    )
+    all_entity_labels = sorted({lab for _, lab in stacked_counts})
 
-    matrix: List[List[int]] = []
-    for ext in ext_labels:
-        row = [stacked_counts[ext].get(lab, 0) for lab in all_entity_labels]
-        matrix.append(row)
+    matrix: List[List[int]] = [
+        [stacked_counts.get((ext, lab), 0) for lab in all_entity_labels]
+        for ext in ext_labels
+    ]
 
     return {
         "donut": {
@@ -1150,6 +1273,26 @@ def report_llm_file_summary(
 
 # ---------- Reason 페이지: 탐지 건수 TOP 5 ----------
 
+# 파라미터 없는 고정 쿼리 → lambda_stmt 로 요청마다 SQL 컴파일 생략
+_REASON_TOP5_STMT = lambda_stmt(
+    lambda: select(
+        LogRecord.hostname.label("pc_name"),
+        LogRecord.host.label("host"),
+        LogRecord.public_ip.label("public_ip"),
+        LogRecord.private_ip.label("private_ip"),
+        func.count(LogRecord.request_id).label("count"),
+    )
+    .where(LogRecord.has_sensitive.is_(True))
+    .group_by(
+        LogRecord.hostname,
+        LogRecord.host,
+        LogRecord.public_ip,
+        LogRecord.private_ip,
+    )
+    .order_by(func.count(LogRecord.request_id).desc())
+    .limit(5)
+)
+
 @router.get("/reason/top5", dependencies=[Depends(require_admin_auth)])
 def reason_top5(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """
@@ -1157,27 +1300,15 @@ def reason_top5(db: Session = Depends(get_db)) -> Dict[str, Any]:
     - has_sensitive=True 인 로그만 대상으로
       host + hostname(PC Name) 기준 탐지 건수 TOP5.
     """
-    cnt_expr = func.count(LogRecord.request_id)
+    latest = db.execute(
+        lambda_stmt(lambda: select(func.max(LogRecord.created_at)))
+    ).scalar()
+    return _cached_by_latest("reason_top5", latest, lambda: _build_reason_top5(db))
 
-    rows = (
-        db.query(
-            LogRecord.hostname.label("pc_name"),
-            LogRecord.host.label("host"),
-            LogRecord.public_ip.label("public_ip"),
-            LogRecord.private_ip.label("private_ip"),
-            cnt_expr.label("count"),
-        )
-        .filter(LogRecord.has_sensitive.is_(True))
-        .group_by(
-            LogRecord.hostname,
-            LogRecord.host,
-            LogRecord.public_ip,
-            LogRecord.private_ip,
-        )
-        .order_by(cnt_expr.desc())
-        .limit(5)
-        .all()
-    )
+
+def _build_reason_top5(db: Session) -> Dict[str, Any]:
+    """reason_top5 실제 집계 (캐시 미스일 때만 호출)."""
+    rows = db.execute(_REASON_TOP5_STMT).all()
 
     items: List[Dict[str, Any]] = []
     for r in rows:
@@ -1219,7 +1350,12 @@ def reason_summary(
             detail="pc_name is required",
         )
 
-    q = db.query(LogRecord).filter(LogRecord.has_sensitive.is_(True))
+    # 카드/테이블/LLM 컨텍스트에 쓰는 컬럼만 로드 (reason_* 는 쓰기만 하므로 제외)
+    q = (
+        db.query(LogRecord)
+        .options(_RECENT_COLUMNS)
+        .filter(LogRecord.has_sensitive.is_(True))
+    )
     q = q.filter(LogRecord.hostname == pc_name)
 
     if host:
@@ -1227,23 +1363,8 @@ def reason_summary(
     if interface:
         q = q.filter(func.lower(LogRecord.interface) == interface.lower())
 
-    logs: List[LogRecord] = q.order_by(LogRecord.created_at.asc()).all()
-
-    if not logs:
-        return {
-            "pc_name": pc_name,
-            "host": host,
-            "interface": interface,
-            "log_count": 0,
-            "overall_result": "",
-            "investigate_users": 0,
-            "educate_users": 0,
-            "intent_rate": 0.0,
-            "intent_counts": {"intentional": 0, "negligent": 0, "unknown": 0},
-            "risk_category_counts": {},
-            "cards": [],
-            "logs": [],
-        }
+    # 전체 결과를 메모리에 올리지 않고 청크 단위로 스트리밍 (컨텍스트는 직전 5개만 유지)
+    logs = q.order_by(LogRecord.created_at.asc()).yield_per(200)
 
     intent_counts: Counter[str] = Counter()
     risk_category_counts: Counter[str] = Counter()
@@ -1251,13 +1372,21 @@ def reason_summary(
     cards: List[Dict[str, Any]] = []
     table_rows: List[Dict[str, Any]] = []
 
-    for idx, r in enumerate(logs):
+    # reason_* 컬럼 갱신분 (루프 후 bulk_update_mappings 로 한 번에 UPDATE)
+    reason_updates: List[Dict[str, Any]] = []
+
+    context_window: deque[LogRecord] = deque(maxlen=6)
+    log_count = 0
+
+    for r in logs:
+        log_count += 1
         entities = r.entities or []
-        risk_info = classify_risk_from_entities(entities)
+        labels = r.label_set
+        risk_info = _classify_label_set(labels)
 
         # 최근 5개 + 현재 로그까지 컨텍스트
-        start = max(0, idx - 5)
-        context_logs = logs[start : idx + 1]
+        context_window.append(r)
+        context_logs = list(context_window)
 
         #intent_type, reason_text = infer_intent_and_reason_from_context(
         #    context_logs, risk_info
@@ -1274,17 +1403,15 @@ def reason_summary(
         risk_category_counts[risk_info["category"]] += 1
 
         # 위험 콤보 라벨 (캐러셀용)
-        combo_labels = detect_combo_labels(entities)
-
-        # DB 컬럼이 있으면 저장 (없으면 조용히 무시)
-        if hasattr(r, "reason"):
-            r.reason = reason_text
-        if hasattr(r, "reason_type"):
-            r.reason_type = intent_type
-        if hasattr(r, "risk_category"):
-            r.risk_category = risk_info["category"]
-        if hasattr(r, "risk_pattern"):
-            r.risk_pattern = risk_info["pattern"]
+        combo_labels = _combo_for_label_set(labels)
+
+        reason_updates.append({
+            "request_id": r.request_id,
+            "reason": reason_text,
+            "reason_type": intent_type,
+            "risk_category": risk_info["category"],
+            "risk_pattern": risk_info["pattern"],
+        })
 
         # 카드용 (프롬프트 위험 분석 결과)
         cards.append(
@@ -1294,11 +1421,7 @@ def reason_summary(
                 "pc_name": r.hostname,
                 "public_ip": r.public_ip,
                 "private_ip": r.private_ip,
-                "prompt": (
-                    (r.prompt[:240] + "…")
-                    if r.prompt and len(r.prompt) > 240
-                    else (r.prompt or "")
-                ),
+                "prompt": _trunc(r.prompt, 240),
                 "entities": [
                     {"label": (e.get("label") or ""), "value": e.get("value")}
                     for e in entities
@@ -1329,6 +1452,22 @@ def reason_summary(
             }
         )
 
+    if not log_count:
+        return {
+            "pc_name": pc_name,
+            "host": host,
+            "interface": interface,
+            "log_count": 0,
+            "overall_result": "",
+            "investigate_users": 0,
+            "educate_users": 0,
+            "intent_rate": 0.0,
+            "intent_counts": {"intentional": 0, "negligent": 0, "unknown": 0},
+            "risk_category_counts": {},
+            "cards": [],
+            "logs": [],
+        }
+
     # 의도성 통계 → 종합 분석 결과용 숫자/문구 생성
     intentional = intent_counts.get("intentional", 0)
     negligent = intent_counts.get("negligent", 0)
@@ -1347,8 +1486,9 @@ def reason_summary(
     investigate_users = intentional
     educate_users = negligent
 
-    # 필요하다면 여기서 db.commit() 호출 (세션 정책에 따라)
+    # 로그별 UPDATE N건 대신 executemany 1회 (세션 정책에 따라 여기서 commit)
     try:
+        db.bulk_update_mappings(LogRecord, reason_updates)
         db.commit()
     except Exception:
         db.rollback()
@@ -1358,7 +1498,7 @@ def reason_summary(
         "pc_name": pc_name,
         "host": host,
         "interface": interface,
-        "log_count": len(logs),
+        "log_count": log_count,
         "overall_result": overall_result,
         "investigate_users": investigate_users,
         "educate_users": educate_users,
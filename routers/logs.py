@@ -1,15 +1,12 @@
 # routers/logs.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
-from db import SessionLocal, Base, engine
+from db import SessionLocal
 from schemas import InItem, ServerOut
 from services.db_logging import DbLoggingService
 
 router = APIRouter()
 
-# 간단 자동 생성 (운영은 Alembic 권장)
-Base.metadata.create_all(bind=engine)
-
 def get_db():
     db = SessionLocal()
     try:
@@ -26,5 +23,7 @@ def healthz():
     return {"ok": True}
 
 @router.post("/logs", response_model=ServerOut)
-def logs(item: InItem, db: Session = Depends(get_db)) -> ServerOut:
-    return DbLoggingService.handle(db, item)
+def logs(item: InItem, db: Session = Depends(get_db)) -> Response:
+    out = DbLoggingService.handle(db, item)
+    # 응답 모델 재검증 + jsonable_encoder 대신 pydantic-core 직렬화 결과를 바로 전송
+    return Response(out.model_dump_json(), media_type="application/json")
@@ -1,16 +1,13 @@
 # routers/mcp.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.orm import Session
 
-from db import SessionLocal, Base, engine
+from db import SessionLocal
 from schemas import McpInItem, McpInResponse
 from services.mcp_logging import McpLoggingService
 
 router = APIRouter()
 
-# 간단 자동 생성 (운영은 Alembic 권장)
-Base.metadata.create_all(bind=engine)
-
 def get_db():
     db = SessionLocal()
     try:
@@ -23,10 +20,12 @@ def get_db():
         db.close()
 
 @router.post("/mcp", response_model=McpInResponse)
-def mcp_config(item: McpInItem, db: Session = Depends(get_db)) -> McpInResponse:
+def mcp_config(item: McpInItem, db: Session = Depends(get_db)) -> Response:
     """
     MCP 설정 파일 업로드 엔드포인트
     - 에이전트에서 claude_desktop_config.json 등 내용을 전송
     - 서버에서 스냅샷 + MCP 서버별 row 로 분해하여 저장
     """
-    return McpLoggingService.handle(db, item)
+    out = McpLoggingService.handle(db, item)
+    # 응답 모델 재검증 + jsonable_encoder 대신 pydantic-core 직렬화 결과를 바로 전송
+    return Response(out.model_dump_json(), media_type="application/json")
@@ -1,97 +1,86 @@
 # routers/settings_api.py
 from __future__ import annotations
 
+import threading
 from datetime import datetime
 from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel, Field
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Text, cast, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from models import SettingsRecord
-from db import SessionLocal  # ✅ get_db가 없으니 SessionLocal을 가져와서 여기서 정의
+from schemas import SettingsConfig, SettingsOut, SettingsUpdateIn
+from db import get_db, get_db_ro  # ✅ GET 은 commit 없는 조회 전용 세션, PUT 만 commit 경로
 from routers.auth_api import require_admin  # ✅ X-Admin-Key 검증(= DB api_key + (선택) ADMIN_KEY 우회)
 
 router = APIRouter(prefix="/api", tags=["settings"])
 
 
-# ✅ 2번 방식: 라우터 내부에서 get_db 직접 정의
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    except Exception:
-        db.rollback()
-        raise
-    finally:
-        db.close()
-
-
-def _dump_model(m) -> dict:
-    if m is None:
-        return {}
-    if hasattr(m, "model_dump"):
-        return m.model_dump()
-    if hasattr(m, "dict"):
-        return m.dict()
-    return dict(m)
-
-
-# =========================
-# ✅ schemas.py 의존 제거 (ImportError 방지)
-# =========================
-class SettingsConfig(BaseModel):
-    # 서버 정책(모든 요청에 영향)
-    response_method: str = Field(default="mask")  # "mask" | "allow" | "block"
-
-    # 서버에 저장되는 서비스 필터
-    # settings.js 와 동일한 구조:
-    # service_filters: {
-    #   llm: { gpt, gemini, claude, deepseek, groq },
-    #   mcp: { gpt_desktop, claude_desktop, vscode_copilot }
-    # }
-    service_filters: Dict[str, Any] = Field(
-        default_factory=lambda: {
-            "llm": {
-                "gpt": True,
-                "gemini": True,
-                "claude": True,
-                "deepseek": True,
-                "groq": True,
-
-                # LLM 추가
-                "grok": True,
-                "perplexity": True,
-                "poe": True,
-                "mistral": True,
-                "cohere": True,
-                "huggingface": True,
-                "you": True,
-                "openrouter": True,
-            },
-            "mcp": {
-                "gpt_desktop": True,
-                "claude_desktop": True,
-                "vscode_copilot": True,
-            },
-        }
-    )
-
-
-class SettingsOut(BaseModel):
-    config: SettingsConfig
-    version: int
-    updated_at: Optional[str] = None
-
-
-class SettingsUpdateIn(BaseModel):
-    config: SettingsConfig
-    version: int
+# ✅ 덤프(직렬화)는 모듈 로드 시 1회 구성한 어댑터로 pydantic-core 에서 바로 처리
+_SETTINGS_ADAPTER: TypeAdapter[SettingsConfig] = TypeAdapter(SettingsConfig)
+
+
+def _settings_body(
+    raw_cfg: bytes, version: Optional[int], updated_at: Optional[datetime]
+) -> bytes:
+    # SettingsOut 과 같은 모양의 JSON 을 바이트로 직접 조립
+    # (config 는 이미 검증/직렬화된 JSON 텍스트 → dict/모델 왕복 없음)
+    return b"".join((
+        b'{"config":', raw_cfg or b"{}",
+        b',"version":', str(int(version or 1)).encode(),
+        b',"updated_at":', orjson.dumps(updated_at.isoformat() if updated_at else None),
+        b"}",
+    ))
+
+
+# ✅ 응답 바이트 캐시 (version 이 같으면 행 로드/직렬화 생략)
+#    워커가 여러 개여도 GET 마다 DB 의 version 과 비교하므로 항상 최신 상태 반영
+_CACHE: Dict[str, Any] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _cache_get(version: Optional[int]) -> Optional[bytes]:
+    with _CACHE_LOCK:
+        if version is not None and _CACHE.get("version") == int(version):
+            return _CACHE["body"]
+    return None
+
+
+def _cache_put(version: int, body: bytes) -> None:
+    with _CACHE_LOCK:
+        _CACHE["version"] = int(version)
+        _CACHE["body"] = body
+
+
+def _etag_headers(version: Optional[int]) -> Dict[str, str]:
+    # ✅ version 정수가 곧 ETag (내용이 바뀌면 version 도 반드시 증가)
+    return {"ETag": f'"v{int(version or 1)}"', "Cache-Control": "no-cache"}
+
+
+# ✅ 기본 설정은 불변이므로 모듈 로드 시 1회만 생성/덤프 (호출부는 수정하지 않음)
+_DEFAULT_CFG = SettingsConfig()
+_DEFAULT_CFG_DICT: Dict[str, Any] = _SETTINGS_ADAPTER.dump_python(_DEFAULT_CFG, mode="json")
 
 
 def _default_config() -> SettingsConfig:
-    return SettingsConfig()
+    return _DEFAULT_CFG
+
+
+def warm_up() -> None:
+    """워커 시작 시 1회: 설정 어댑터를 미리 돌려 첫 요청 지연 제거 (모델 스키마는 schemas.py 에서 선빌드)"""
+    _SETTINGS_ADAPTER.validate_python(_DEFAULT_CFG_DICT)
+    _SETTINGS_ADAPTER.dump_json(_DEFAULT_CFG)
+
+
+# ON CONFLICT DO NOTHING 을 지원하는 방언별 insert
+_CONFLICT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
 
 
 def _get_or_create_settings(db: Session) -> SettingsRecord:
@@ -99,16 +88,27 @@ def _get_or_create_settings(db: Session) -> SettingsRecord:
     if rec:
         return rec
 
-    # ✅ 생성 시 레이스 방어 (동시에 여러 요청이 들어오면 IntegrityError 가능)
+    # ✅ 생성 레이스는 DB 가 처리: INSERT ... ON CONFLICT DO NOTHING (한 문장, 예외 흐름 없음)
+    insert_fn = _CONFLICT_INSERTS.get(db.get_bind().dialect.name)
+    if insert_fn is not None:
+        db.execute(
+            insert_fn(SettingsRecord)
+            .values(id=1, config_json=_DEFAULT_CFG_DICT, version=1, updated_at=datetime.now())
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+        db.commit()
+        return db.get(SettingsRecord, 1)
+
+    # 그 외 DB: 기존 방식 (동시에 여러 요청이 들어오면 IntegrityError 가능)
     rec = SettingsRecord(id=1)
-    rec.set_config(_dump_model(_default_config()))
+    rec.set_config(_DEFAULT_CFG_DICT)
     rec.version = 1
     rec.updated_at = datetime.now()
     db.add(rec)
 
     try:
         db.commit()       # ✅ 최초 생성은 여기서 커밋/반영
-        db.refresh(rec)
+        # id/version/updated_at/config 모두 위에서 직접 채웠으므로 refresh(SELECT) 불필요
         return rec
     except IntegrityError:
         db.rollback()
@@ -118,52 +118,78 @@ def _get_or_create_settings(db: Session) -> SettingsRecord:
         raise
 
 
-@router.get("/settings", response_model=SettingsOut)
+# ✅ 응답 바이트(Response)를 직접 반환 → jsonable_encoder/응답 모델 재검증 생략 (response_model 은 문서용)
+@router.get("/settings", response_model=SettingsOut, response_class=ORJSONResponse)
 def get_settings(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_ro),
     _: Any = Depends(require_admin),  # ✅ X-Admin-Key 검증은 auth_api 로 통일
-) -> SettingsOut:
-    rec = _get_or_create_settings(db)
-
-    cfg_dict = rec.get_config() or {}
-    try:
-        cfg = SettingsConfig(**cfg_dict)
-    except Exception:
-        cfg = _default_config()
-
-    return SettingsOut(
-        config=cfg,
-        version=int(rec.version or 1),
-        updated_at=rec.updated_at.isoformat() if rec.updated_at else None,
-    )
-
-
-@router.put("/settings", response_model=SettingsOut)
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
+    # PK 로 version 만 먼저 조회 → 클라이언트 ETag 와 같으면 304, 캐시와 같으면 그대로 반환
+    version = db.execute(
+        select(SettingsRecord.version).where(SettingsRecord.id == 1)
+    ).scalar()
+    if version is not None:
+        headers = _etag_headers(version)
+        if if_none_match == headers["ETag"]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        cached = _cache_get(version)
+        if cached is not None:
+            return Response(cached, media_type="application/json", headers=headers)
+
+    # ✅ 저장된 JSON 텍스트를 그대로 꺼내 응답에 끼워 넣음 (검증은 쓰기 쪽에서만)
+    stmt = select(
+        SettingsRecord.version,
+        SettingsRecord.updated_at,
+        cast(SettingsRecord.config_json, Text),
+    ).where(SettingsRecord.id == 1)
+    row = db.execute(stmt).first()
+    if row is None:
+        _get_or_create_settings(db)
+        row = db.execute(stmt).one()
+
+    version, updated_at, raw_cfg = row
+    body = _settings_body((raw_cfg or "{}").encode(), version, updated_at)
+    _cache_put(int(version or 1), body)
+    return Response(body, media_type="application/json", headers=_etag_headers(version))
+
+
+@router.put("/settings", response_class=ORJSONResponse)  # 응답은 직접 조립한 바이트 (response_model 없음)
 def update_settings(
     body: SettingsUpdateIn,
     db: Session = Depends(get_db),
     _: Any = Depends(require_admin),  # ✅ X-Admin-Key 검증은 auth_api 로 통일
-) -> SettingsOut:
-    rec = _get_or_create_settings(db)
-
-    # ✅ 낙관적 락(버전 충돌 감지)
-    if body.version is not None and int(body.version) != int(rec.version or 1):
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Settings version mismatch (server={rec.version}, client={body.version})"
+) -> Response:
+    new_cfg = _SETTINGS_ADAPTER.dump_python(body.config, mode="json")
+    raw_cfg = orjson.dumps(new_cfg)  # 응답용 JSON 은 여기서 한 번만 생성
+    client_version = int(body.version)
+
+    def _try_update() -> tuple[int, datetime]:
+        # ✅ 낙관적 락을 DB 에 위임: version 이 같을 때만 1건 UPDATE (읽기-수정-쓰기 경쟁 없음)
+        now = datetime.now()
+        res = db.execute(
+            update(SettingsRecord)
+            .where(SettingsRecord.id == 1, SettingsRecord.version == client_version)
+            .values(config_json=new_cfg, version=SettingsRecord.version + 1, updated_at=now)
         )
-
-    new_cfg = _dump_model(body.config)
-    rec.set_config(new_cfg)
-    rec.version = int(rec.version or 1) + 1
-    rec.updated_at = datetime.now()
-    db.add(rec)
+        return res.rowcount, now
+
+    updated, now = _try_update()
+    if updated == 0:
+        # 행이 아직 없으면 기본값으로 생성(version=1) 후 한 번만 재시도, 있으면 버전 충돌
+        rec = _get_or_create_settings(db)
+        server_version = int(rec.version or 1)
+        if server_version == client_version:
+            updated, now = _try_update()
+        if updated == 0:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Settings version mismatch (server={server_version}, client={client_version})"
+            )
 
     db.commit()
-    db.refresh(rec)
 
-    return SettingsOut(
-        config=SettingsConfig(**(rec.get_config() or {})),
-        version=int(rec.version or 1),
-        updated_at=rec.updated_at.isoformat() if rec.updated_at else None,
-    )
+    # 방금 쓴 값으로 응답 구성 (재조회 없음, 직렬화는 위에서 1회)
+    out = _settings_body(raw_cfg, client_version + 1, now)
+    _cache_put(client_version + 1, out)
+    return Response(out, media_type="application/json", headers=_etag_headers(client_version + 1))
@@ -4,15 +4,21 @@ from typing import Optional, List, Dict, Any
 
 from pydantic import BaseModel, Field
 
+__all__ = [
+    "Attachment", "InItem", "Entity", "ServerOut",
+    "McpInItem", "McpInResponse",
+    "SettingsConfig", "SettingsOut", "SettingsUpdateIn",
+]
+
 # --- Pydantic v2 / v1 호환 임포트 ---
 try:
-    from pydantic import AliasChoices, ConfigDict, model_validator  # v2
+    from pydantic import AliasChoices, ConfigDict, field_validator  # v2
     _PYD_V2 = True
 except Exception:  # v1 fallback
     _PYD_V2 = False
     AliasChoices = None  # type: ignore
     ConfigDict = None  # type: ignore
-    model_validator = None  # type: ignore
+    field_validator = None  # type: ignore
     try:
         from pydantic import root_validator  # type: ignore
     except Exception:
@@ -20,9 +26,22 @@ except Exception:  # v1 fallback
 
 
 # --------------------- 공통 유틸 ---------------------
-def _pc_name_field_v2():
-    # PCName / pcName / pc_name 를 모두 pc_name에 매핑
-    return Field(default=None, validation_alias=AliasChoices("PCName", "pcName", "pc_name"))  # type: ignore[arg-type]
+# ✅ v1/v2 분기/별칭 객체는 import 시 1회만 구성해서 모든 모델이 공유
+# PCName / pcName / pc_name 를 모두 pc_name에 매핑
+_PC_NAME_ALIASES = AliasChoices("PCName", "pcName", "pc_name") if _PYD_V2 else None
+
+
+def _pc_name_field_v2(default: Optional[str] = None):
+    return Field(default=default, validation_alias=_PC_NAME_ALIASES)  # type: ignore[arg-type]
+
+
+class _IgnoreExtraModel(BaseModel):
+    """모든 스키마 공통 베이스: 모르는 필드는 무시 (v1/v2 설정을 여기 한 곳에서만 분기)"""
+    if _PYD_V2:
+        model_config = ConfigDict(extra="ignore")  # type: ignore[misc]
+    else:
+        class Config:
+            extra = "ignore"
 
 
 def _merge_pcname_aliases(values: Dict[str, Any]) -> Dict[str, Any]:
@@ -33,6 +52,13 @@ def _merge_pcname_aliases(values: Dict[str, Any]) -> Dict[str, Any]:
     return values
 
 
+def _unknown_if_blank(v: Any) -> Any:
+    # 단일 필드용 보정: None / 공백 문자열 → "unknown"
+    if v is None or (isinstance(v, str) and not v.strip()):
+        return "unknown"
+    return v
+
+
 def _fill_unknown_minimum(values: Dict[str, Any], keys: List[str]) -> Dict[str, Any]:
     # 서버/DB에서 nullable=False 로 쓰는 필드가 비어있으면 unknown으로 보정
     for k in keys:
@@ -42,7 +68,7 @@ def _fill_unknown_minimum(values: Dict[str, Any], keys: List[str]) -> Dict[str,
 
 
 # --------------------- 기본 객체 ---------------------
-class Attachment(BaseModel):
+class Attachment(_IgnoreExtraModel):
     # format: 서버에서 지원하는 확장자 (예: "png", "jpg", "pdf", "docx" ...)
     format: Optional[str] = None
     # data: base64 인코딩된 파일 데이터 (요청/응답 공통)
@@ -54,34 +80,27 @@ class Attachment(BaseModel):
     # 파일 내용이 원본 대비 변경되었는지(레댁션/토큰 치환 등)
     file_change: bool = False
 
-    if _PYD_V2:
-        model_config = ConfigDict(extra="ignore")  # type: ignore[misc]
-    else:
-        class Config:
-            extra = "ignore"
-
 
 # --------------------- 입력 스키마 ---------------------
-class InItem(BaseModel):
+class InItem(_IgnoreExtraModel):
     # 시간/식별
     time: str
     public_ip: Optional[str] = None
     private_ip: Optional[str] = None
 
-    # 호스트/호스트명
-    host: Optional[str] = None
+    # 호스트/호스트명 (없거나 비어 있으면 "unknown")
+    host: Optional[str] = "unknown"
     hostname: Optional[str] = None  # 구 에이전트 필드가 그대로 들어오면 사용
 
     # PC 이름 (여러 별칭 허용)
     if _PYD_V2:
         pc_name: Optional[str] = _pc_name_field_v2()
-        model_config = ConfigDict(populate_by_name=True, extra="ignore")  # type: ignore[misc]
+        model_config = ConfigDict(populate_by_name=True)  # type: ignore[misc]
     else:
         pc_name: Optional[str] = Field(default=None, alias="pc_name")
 
         class Config:
             allow_population_by_field_name = True
-            extra = "ignore"
 
         if root_validator:
             @root_validator(pre=True)
@@ -95,13 +114,12 @@ class InItem(BaseModel):
 
     # (선택) 최소 보정: host가 없으면 서버에서 anyway "unknown" 처리하지만,
     # 여기서도 한 번 보정해두면 downstream이 편해짐
-    if _PYD_V2 and model_validator:
-        @model_validator(mode="before")
+    # ✅ v2: 별칭은 AliasChoices(pydantic-core)가 처리 → 입력 dict 전체를 도는 before 훅 대신 필드 단위 보정
+    if _PYD_V2:
+        @field_validator("host", mode="before")
         @classmethod
-        def _fill_minimum_v2(cls, values):
-            if isinstance(values, dict):
-                values = _fill_unknown_minimum(values, ["host"])
-            return values
+        def _fill_host_v2(cls, v):
+            return _unknown_if_blank(v)
     else:
         if root_validator:
             @root_validator(pre=True)
@@ -112,20 +130,14 @@ class InItem(BaseModel):
 
 
 # --------------------- 엔티티/응답 스키마 ---------------------
-class Entity(BaseModel):
+class Entity(_IgnoreExtraModel):
     value: str
     begin: int
     end: int
     label: str
 
-    if _PYD_V2:
-        model_config = ConfigDict(extra="ignore")  # type: ignore[misc]
-    else:
-        class Config:
-            extra = "ignore"
-
 
-class ServerOut(BaseModel):
+class ServerOut(_IgnoreExtraModel):
     request_id: str
     host: str
     modified_prompt: str
@@ -143,35 +155,28 @@ class ServerOut(BaseModel):
     # 레댁션/디텍션 완료된 첨부파일 (없으면 None)
     attachment: Optional[Attachment] = None
 
-    if _PYD_V2:
-        model_config = ConfigDict(extra="ignore")  # type: ignore[misc]
-    else:
-        class Config:
-            extra = "ignore"
-
 
 # ===================== MCP 설정 파일용 스키마 =====================
-class McpInItem(BaseModel):
+class McpInItem(_IgnoreExtraModel):
     """
     에이전트에서 /api/mcp 로 보내는 MCP 설정 파일 정보
     """
     time: str
-    public_ip: Optional[str] = None
+    public_ip: Optional[str] = "unknown"
     private_ip: Optional[str] = None
 
     # LLM 환경 / 호스트 (예: 'claude', 'chatgpt', ...)
-    host: Optional[str] = None
+    host: Optional[str] = "unknown"
 
     # PC 이름 (여러 별칭 허용)
     if _PYD_V2:
-        pc_name: Optional[str] = _pc_name_field_v2()
-        model_config = ConfigDict(populate_by_name=True, extra="ignore")  # type: ignore[misc]
+        pc_name: Optional[str] = _pc_name_field_v2(default="unknown")
+        model_config = ConfigDict(populate_by_name=True)  # type: ignore[misc]
     else:
-        pc_name: Optional[str] = Field(default=None, alias="pc_name")
+        pc_name: Optional[str] = Field(default="unknown", alias="pc_name")
 
         class Config:
             allow_population_by_field_name = True
-            extra = "ignore"
 
         if root_validator:
             @root_validator(pre=True)
@@ -184,15 +189,12 @@ class McpInItem(BaseModel):
 
     # ✅ DB에서 nullable=False 로 쓰는 필드가 많으니 최소 보정
     # (서버에서 바로 insert할 때 터지는 거 방지)
-    if _PYD_V2 and model_validator:
-        @model_validator(mode="before")
+    # host / pc_name 은 DB에서 NOT NULL인 경우가 많아서 unknown 보정 (기본값도 "unknown")
+    if _PYD_V2:
+        @field_validator("host", "pc_name", "public_ip", mode="before")
         @classmethod
-        def _fill_minimum_v2(cls, values):
-            if isinstance(values, dict):
-                values = _merge_pcname_aliases(values)
-                # host / pc_name 은 DB에서 NOT NULL인 경우가 많아서 unknown 보정
-                values = _fill_unknown_minimum(values, ["host", "pc_name", "public_ip"])
-            return values
+        def _fill_minimum_v2(cls, v):
+            return _unknown_if_blank(v)
     else:
         if root_validator:
             @root_validator(pre=True)
@@ -203,7 +205,7 @@ class McpInItem(BaseModel):
                 return values
 
 
-class McpInResponse(BaseModel):
+class McpInResponse(_IgnoreExtraModel):
     """
     /api/mcp 응답: 저장 결과 요약
     """
@@ -211,8 +213,64 @@ class McpInResponse(BaseModel):
     mcp_scope: str
     total_servers: int
 
+
+# ===================== 서버 설정(/api/settings) 스키마 =====================
+class SettingsConfig(_IgnoreExtraModel):
+    # 서버 정책(모든 요청에 영향)
+    response_method: str = Field(default="mask")  # "mask" | "allow" | "block"
+
+    # 서버에 저장되는 서비스 필터
+    # settings.js 와 동일한 구조:
+    # service_filters: {
+    #   llm: { gpt, gemini, claude, deepseek, groq },
+    #   mcp: { gpt_desktop, claude_desktop, vscode_copilot }
+    # }
+    service_filters: Dict[str, Any] = Field(
+        default_factory=lambda: {
+            "llm": {
+                "gpt": True,
+                "gemini": True,
+                "claude": True,
+                "deepseek": True,
+                "groq": True,
+
+                # LLM 추가
+                "grok": True,
+                "perplexity": True,
+                "poe": True,
+                "mistral": True,
+                "cohere": True,
+                "huggingface": True,
+                "you": True,
+                "openrouter": True,
+            },
+            "mcp": {
+                "gpt_desktop": True,
+                "claude_desktop": True,
+                "vscode_copilot": True,
+            },
+        }
+    )
+
+
+class SettingsOut(_IgnoreExtraModel):
+    config: SettingsConfig
+    version: int
+    updated_at: Optional[str] = None
+
+
+class SettingsUpdateIn(_IgnoreExtraModel):
+    config: SettingsConfig
+    version: int
+
+
+# ✅ 스키마(검증기/직렬화기)는 import 시점에 미리 완성 → 첫 요청에서 빌드 비용을 내지 않음
+for _model in (
+    Attachment, InItem, Entity, ServerOut, McpInItem, McpInResponse,
+    SettingsConfig, SettingsOut, SettingsUpdateIn,
+):
     if _PYD_V2:
-        model_config = ConfigDict(extra="ignore")  # type: ignore[misc]
+        _model.model_rebuild()
     else:
-        class Config:
-            extra = "ignore"
+        _model.update_forward_refs()
+del _model
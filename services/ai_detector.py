@@ -1,15 +1,29 @@
 # services/ai_detector.py
-# 오프라인 전용 AI 탐지기 (모델 1회 로드 → 스레드 세이프 재사용)
+# 오프라인 전용 AI 탐지기 (모델 1회 로드 → 배칭 워커 1개가 동시 요청을 묶어서 처리)
 
 from __future__ import annotations
 
+import asyncio
 import os
-import json
+import queue
+import re
+import tempfile
 import threading
-from typing import Any, Dict, List
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+from itertools import islice
+from typing import Any, Dict, List, Tuple
 
+import orjson
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import (
+    AutoTokenizer,
+    AutoModelForCausalLM,
+    BitsAndBytesConfig,
+    StoppingCriteria,
+    StoppingCriteriaList,
+)
 
 # --- 토글: 내부 엔진 사용 여부 (기본 끔) ---------------------------------------
 # 외부 실행기(ai_external.py) 경로가 기본이며, 내부 엔진은 필요 시에만 켭니다.
@@ -64,23 +78,86 @@ _ALLOWED = {
     "IPV4", "IPV6", "MAC_ADDRESS", "IMEI",
 }
 
+# --- 동적 배칭: 동시 요청을 최대 MAX_BATCH 개 / MAX_WAIT_MS 까지 모아 generate 1회 ---
+MAX_BATCH = int(os.getenv("DETECTOR_MAX_BATCH", "8"))
+MAX_WAIT_MS = float(os.getenv("DETECTOR_MAX_WAIT_MS", "10"))
+# 호출자가 워커 결과를 기다리는 상한(초) — 넘기면 폴백 결과 (워커 이상 시 스레드풀 스레드가 무한 대기하지 않도록)
+RESULT_TIMEOUT_S = float(os.getenv("DETECTOR_RESULT_TIMEOUT_S", "60"))
+# 한 번에 모인 요청을 사용자 입력 토큰 길이 구간(≤128 / ≤512 / ≤2048 / 그 이상)별로 나눠 generate
+LENGTH_BINS = tuple(sorted(int(x) for x in os.getenv("DETECTOR_LENGTH_BINS", "128,512,2048").split(",") if x.strip()))
+
+# --- 가중치 양자화(선택): "4bit"(nf4) / "8bit" — bitsandbytes 설치 + GPU 필요, 기본은 원본 dtype ---
+QUANT = os.getenv("DETECTOR_QUANT", "").strip().lower()
+
+# --- 응답 머리 고정: assistant 턴을 '{"has_sensitive":' 로 시작시켜 JSON 외 서두/코드펜스 생성 차단 ("0" 이면 끔) ---
+JSON_PRIME = '{"has_sensitive":' if os.getenv("DETECTOR_JSON_PRIME", "1") == "1" else ""
+
+# --- 어텐션 구현: "sdpa"(기본, PyTorch fused 커널) / "flash_attention_2"(flash-attn 설치 시) ---
+ATTN_IMPL = os.getenv("DETECTOR_ATTN", "sdpa").strip() or "sdpa"
+
+# --- KV 캐시(선택): "1" 이면 generate 가 StaticCache 를 미리 할당해 배치 간 재사용 (요청마다 DynamicCache 할당/확장 생략) ---
+STATIC_CACHE = os.getenv("DETECTOR_STATIC_CACHE", "0") == "1"
+
+# --- 추측 디코딩(선택): 초안 모델이 한 스텝에 제안할 토큰 수 (ASSISTANT_MODEL_DIR 지정 시에만 사용) ---
+ASSISTANT_TOKENS = int(os.getenv("DETECTOR_ASSISTANT_TOKENS", "5"))
+
+# --- KV 캐시 양자화(선택): "quanto:4" / "hqq:4" 처럼 백엔드:비트 — optimum-quanto 또는 hqq 설치 필요, 기본 끔 ---
+KV_QUANT = os.getenv("DETECTOR_KV_QUANT", "").strip().lower()
+
+# --- torch.compile(선택): "1" 이면 StaticCache + decode forward 를 reduce-overhead(CUDA graph)로 컴파일 ---
+COMPILE = os.getenv("DETECTOR_COMPILE", "0") == "1"
+if COMPILE:
+    # 컴파일 산출물을 디스크에 남겨 재시작 시 첫 요청 컴파일 비용 재사용
+    # (미지정 시 서비스 계정도 쓸 수 있는 임시 디렉터리 아래로)
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "sentinel-inductor"))
+    os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+
+def _quantization_kwargs() -> Dict[str, Any]:
+    if QUANT == "4bit":
+        return {"quantization_config": BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_compute_dtype=torch.bfloat16,
+            bnb_4bit_quant_type="nf4",
+        )}
+    if QUANT == "8bit":
+        return {"quantization_config": BitsAndBytesConfig(load_in_8bit=True)}
+    return {}
+
+def _compile_config():
+    """CompileConfig 는 컴파일을 켰을 때만 import (없는 transformers 버전이면 None → 컴파일 없이 동작)"""
+    try:
+        from transformers import CompileConfig
+    except ImportError:
+        return None
+    return CompileConfig(fullgraph=True, dynamic=False, mode="reduce-overhead")
+
 def _default_result() -> Dict[str, Any]:
     return {"has_sensitive": False, "entities": []}
 
+# JSON 구조 토큰: 문자열 리터럴(이스케이프 포함, 미종결이면 끝까지) 통째로 / 중괄호
+_JSON_STRUCT_RE = re.compile(r'[{}"\\]')
+
 def _extract_json(s: str) -> Dict[str, Any]:
     """
     모델이 토크나이저 템플릿까지 함께 디코딩하는 상황을 고려해
     마지막 { ... } 블록을 역방향으로 복구하여 JSON만 파싱.
+    뒤집은 문자열에서 구조 문자(따옴표/역슬래시/중괄호)만 건너뛰며 처리하므로 파이썬 루프는 그 수만큼만 돈다.
     """
     end = s.rfind("}")
     if end == -1:
         return _default_result()
+    rev = s[end::-1]
     level = 0
     start = None
     in_str = False
     esc = False
-    for i in range(end, -1, -1):
-        ch = s[i]
+    last = -1
+    for m in _JSON_STRUCT_RE.finditer(rev):
+        j = m.start()
+        if esc and j != last + 1:
+            esc = False  # 사이의 일반 문자가 이스케이프를 소비
+        last = j
+        ch = rev[j]
         if in_str:
             if esc:
                 esc = False
@@ -89,27 +166,94 @@ def _extract_json(s: str) -> Dict[str, Any]:
             elif ch == '"':
                 in_str = False
             continue
-        else:
-            if ch == '"':
-                in_str = True
-                continue
-            if ch == "}":
-                level += 1
-            elif ch == "{":
-                level -= 1
-                if level == 0:
-                    start = i
-                    break
+        if ch == '"':
+            in_str = True
+            continue
+        if ch == "}":
+            level += 1
+        elif ch == "{":
+            level -= 1
+            if level == 0:
+                start = end - j
+                break
     if start is None:
         return _default_result()
     try:
-        return json.loads(s[start:end + 1])
+        return orjson.loads(s[start:end + 1])
     except Exception:
         return _default_result()
 
 
+def _parse_output(s: str) -> Dict[str, Any]:
+    """생성분이 JSON 그 자체면 바로 파싱, 아니면(설명/코드펜스 섞임) 역방향 복구로 폴백"""
+    s = s.strip()
+    if s.startswith("{") and s.endswith("}"):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass
+    return _extract_json(s)
+
+
+class _JsonBalanceStop(StoppingCriteria):
+    """
+    생성 스트림의 중괄호 균형을 시퀀스별로 추적해서,
+    첫 '{' 이후 level 이 0 으로 돌아오면(최상위 JSON 완성) 그 시퀀스는 생성 종료.
+    나머지 토큰은 어차피 _parse_output 에서 버려지므로 max_new_tokens 까지 디코딩할 필요 없음.
+    """
+
+    def __init__(self, tok, prompt_len: int, batch_size: int, open_level: int = 0):
+        self.tok = tok
+        self.seen = prompt_len  # 이미 처리한 위치 (왼쪽 패딩이라 모든 행이 같은 길이에서 시작)
+        self.level = [open_level] * batch_size  # 프롬프트에 이미 연 '{' 가 있으면 1 부터
+        self.in_str = [False] * batch_size
+        self.esc = [False] * batch_size
+        self.done = [False] * batch_size
+        self._pieces: Dict[int, str] = {}  # 토큰 id → 디코딩 문자열 캐시
+
+    def _piece(self, tid: int) -> str:
+        p = self._pieces.get(tid)
+        if p is None:
+            p = self._pieces[tid] = self.tok.decode([tid], skip_special_tokens=True)
+        return p
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        new = input_ids[:, self.seen:].tolist()  # 추측 디코딩이면 한 스텝에 여러 토큰
+        self.seen = input_ids.shape[-1]
+        for row, ids in enumerate(new):
+            if self.done[row]:
+                continue
+            level, in_str, esc = self.level[row], self.in_str[row], self.esc[row]
+            for ch in "".join(self._piece(t) for t in ids):
+                if in_str:
+                    if esc:
+                        esc = False
+                    elif ch == "\\":
+                        esc = True
+                    elif ch == '"':
+                        in_str = False
+                elif ch == '"':
+                    in_str = True
+                elif ch == "{":
+                    level += 1
+                elif ch == "}" and level > 0:
+                    level -= 1
+                    if level == 0:
+                        self.done[row] = True
+                        break
+            self.level[row], self.in_str[row], self.esc[row] = level, in_str, esc
+        return torch.tensor(self.done, dtype=torch.bool, device=input_ids.device)
+
+
 class _Detector:
-    def __init__(self, model_dir: str, max_new_tokens: int = 256):
+    def __init__(
+        self,
+        model_dir: str,
+        max_new_tokens: int = 256,
+        max_batch: int = MAX_BATCH,
+        max_wait_ms: float = MAX_WAIT_MS,
+        assistant_dir: str | None = None,
+    ):
         # 로컬 전용 로딩(네트워크 미접속) + Bandit B615 완화
         revision = os.getenv("MODEL_REVISION", "").strip() or None
         allow_trc = (os.getenv("ALLOW_TRUST_REMOTE_CODE", "").strip() == "1")
@@ -124,75 +268,305 @@ class _Detector:
         self.tok = AutoTokenizer.from_pretrained(
             model_dir, use_fast=True, **common_kwargs
         )  # nosec B615: local path or pinned
-        self.model = AutoModelForCausalLM.from_pretrained(
-            model_dir, device_map="auto", torch_dtype="auto", **common_kwargs
-        )  # nosec B615: local path or pinned
+        load_kwargs = dict(device_map="auto", torch_dtype="auto", **_quantization_kwargs(), **common_kwargs)
+        try:
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_dir, attn_implementation=ATTN_IMPL, **load_kwargs
+            )  # nosec B615: local path or pinned
+        except (ImportError, ValueError):
+            # flash_attention_2 패키지/모델 지원이 없으면 PyTorch 내장 fused 커널(SDPA)로
+            self.model = AutoModelForCausalLM.from_pretrained(
+                model_dir, attn_implementation="sdpa", **load_kwargs
+            )  # nosec B615: local path or pinned
         self.model.eval()
 
+        # 추측(assisted) 디코딩용 소형 초안 모델(같은 토크나이저 계열) — greedy 라 출력은 동일
+        self.assistant = None
+        if assistant_dir:
+            self.assistant = AutoModelForCausalLM.from_pretrained(
+                assistant_dir, device_map="auto", torch_dtype="auto", **common_kwargs
+            )  # nosec B615: local path or pinned
+            self.assistant.eval()
+            self.assistant.generation_config.num_assistant_tokens = ASSISTANT_TOKENS
+
+        gen_cfg = self.model.generation_config
+        if STATIC_CACHE or COMPILE:
+            # generate 가 (배치, 프롬프트+max_new_tokens) 크기의 StaticCache 를 만들어 모델에 보관하고,
+            # 이후 호출은 크기가 맞으면 reset 만 해서 재사용 (더 긴 배치가 오면 그때만 재할당)
+            gen_cfg.cache_implementation = "static"
+        elif KV_QUANT:
+            # KV 를 저비트로 저장하는 QuantizedCache (디코드 스텝마다 읽는 캐시 바이트 감소)
+            backend, _, nbits = KV_QUANT.partition(":")
+            gen_cfg.cache_implementation = "quantized"
+            gen_cfg.cache_config = {"backend": backend, "nbits": int(nbits or 4)}
+        compile_config = _compile_config() if COMPILE else None
+        if compile_config is not None:
+            # StaticCache 로 shape 가 고정된 decode forward 를 generate 가 컴파일해서 사용
+            gen_cfg.compile_config = compile_config
+        else:
+            # StaticCache 만 켠 경우 GPU 에서 generate 가 알아서 컴파일하지 않도록 명시적으로 끔
+            gen_cfg.disable_compile = True
+
+        if torch.cuda.is_available():
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cuda.enable_flash_sdp(True)
+            torch.backends.cuda.enable_mem_efficient_sdp(True)
+
         if self.tok.pad_token is None:
             self.tok.pad_token = self.tok.eos_token
+        # 디코더 전용 모델: 배치 생성 시 프롬프트 끝이 맞도록 왼쪽 패딩
+        self.tok.padding_side = "left"
+
+        self._init_prompt_prefix()
+
+        # GPU 입력 전송용 pinned staging 버퍼 (필요 시 커지며 재사용 → 매 요청 pageable 복사 생략)
+        self._pinned: Dict[str, torch.Tensor] = {}
 
         self.max_new_tokens = max_new_tokens
-        self.lock = threading.Lock()
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        # 길이 구간별 [generate 횟수, 요청 수] — 구간 경계 재조정용 (평균 배치 = 요청 수 / 횟수)
+        self.bin_stats: List[List[int]] = [[0, 0] for _ in range(len(LENGTH_BINS) + 1)]
+
+        # 요청 큐 + 배칭 워커(모델을 만지는 스레드는 이 워커 하나뿐 → 별도 lock 불필요)
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker_lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._ensure_worker()
+
+    # ---- 배칭 워커 ----
+    def _ensure_worker(self) -> None:
+        """워커가 없거나 (예상 못 한 에러로) 죽었으면 새로 띄움 — 큐에 남은 요청은 새 워커가 이어서 처리"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="detector-batcher", daemon=True)
+                self._worker.start()
+
+    def _drain(self) -> List[Tuple[str, Future]]:
+        """
+        첫 요청은 대기, 이후 max_wait 안에 들어온 요청을 max_batch 개까지 모음
+        (꺼내는 시점에 RUNNING 으로 전환 → 이미 취소된 요청(클라이언트 끊김 등)은 버리고,
+         이후에는 cancel() 이 실패하므로 set_result 가 InvalidStateError 를 내지 않음)
+        """
+        items: List[Tuple[str, Future]] = []
+        deadline = None
+        while len(items) < self.max_batch:
+            if deadline is None:
+                item = self._queue.get()
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if not item[1].set_running_or_notify_cancel():
+                continue
+            items.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.max_wait
+        return items
+
+    def _run(self) -> None:
+        while True:
+            items = self._drain()
+            # 어떤 에러도 500으로 번지지 않도록: 처리 못 한 항목은 폴백 결과 그대로
+            results = [_default_result() for _ in items]
+            try:
+                self._run_batch([text for text, _ in items], results)
+            except Exception:
+                pass  # 배치 하나의 실패로 유일한 워커 스레드가 죽지 않도록
+            for (_, fut), res in zip(items, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+    def _run_batch(self, texts: List[str], results: List[Dict[str, Any]]) -> None:
+        """모인 요청을 길이 구간별로 generate 해서 results 를 채움 (구간 하나가 실패해도 나머지는 진행)"""
+        ids = self._encode_ids(texts)
+        for idxs in self._buckets(ids):
+            try:
+                outs = self._generate_batch([ids[i] for i in idxs])
+            except Exception:
+                continue
+            for i, res in zip(idxs, outs):
+                results[i] = res
 
-    def analyze(self, text: str) -> Dict[str, Any]:
+    def _buckets(self, ids: List[List[int]]):
         """
-        입력 텍스트 -> 모델 생성 -> JSON 파싱 -> 허용 라벨만 필터링
-        실패 시 안전 폴백(_default_result) 반환.
+        사용자 입력 토큰 길이로 LENGTH_BINS 구간을 나눠 구간별로 generate
+        (짧은 요청이 긴 요청 길이만큼 패딩돼 매 디코드 스텝 낭비하지 않도록)
         """
-        messages = [
-            {"role": "system", "content": SYS_PROMPT},
-            {"role": "user",   "content": text or ""},
-        ]
+        head = len(self._head_ids)
+        bins: Dict[int, List[int]] = {}
+        for i, x in enumerate(ids):
+            bins.setdefault(bisect_left(LENGTH_BINS, len(x) - head), []).append(i)
+        for b, idxs in sorted(bins.items()):
+            stat = self.bin_stats[b]
+            stat[0] += 1
+            stat[1] += len(idxs)
+            yield idxs
+
+    # ---- 프롬프트 구성 ----
+    _USER_MARKER = "\x00__SENTINEL_USER__\x00"
+
+    # 경계 병합 검사용 입력 (앞 공백/줄바꿈으로 시작하는 입력까지)
+    _PROBES = ("probe: user text 123", " 123\nprobe")
+
+    def _render(self, text: str) -> str:
+        return self.tok.apply_chat_template(
+            [
+                {"role": "system", "content": SYS_PROMPT},
+                {"role": "user",   "content": text},
+            ],
+            tokenize=False,
+            add_generation_prompt=True,
+        ) + JSON_PRIME
+
+    def _init_prompt_prefix(self) -> None:
+        """
+        SYS_PROMPT 는 고정이므로 chat template 을 1회만 렌더링해서
+        [시스템+user 여는 부분] / [user 닫고 assistant 여는 부분] 으로 나눠 두고,
+        시스템 쪽은 토큰 id 까지 미리 계산 (요청마다 Jinja 렌더링/SYS_PROMPT 토크나이즈 생략)
+        나눠서 토크나이즈한 결과가 통째로 토크나이즈한 결과와 다르면(경계에서 병합되는 토크나이저)
+        요청마다 렌더링하는 기존 방식 사용 (det_min.prompt_head_ids 와 같은 검사)
+        """
+        self._prompt_tail: str | None = None
+        self._head_ids: List[int] = []
+        head, sep, tail = self._render(self._USER_MARKER).partition(self._USER_MARKER)
+        if not sep:
+            # 템플릿이 content 를 가공하는 경우
+            return
+        head_ids = self.tok(head, add_special_tokens=False)["input_ids"]
+        for probe in self._PROBES:
+            split = head_ids + self.tok(probe + tail, add_special_tokens=False)["input_ids"]
+            if split != self.tok(self._render(probe), add_special_tokens=False)["input_ids"]:
+                return
+        self._prompt_tail = tail
+        self._head_ids = head_ids
+
+    def _encode_ids(self, texts: List[str]) -> List[List[int]]:
+        """요청별 프롬프트 토큰 id (패딩 전)"""
+        if self._prompt_tail is None:
+            prompts = [self._render(text) for text in texts]
+            return self.tok(prompts, add_special_tokens=False)["input_ids"]
+
+        # 사용자 입력 구간만 토크나이즈 → 캐시된 시스템 프롬프트 id 앞에 붙임
+        user_ids = self.tok(
+            [text + self._prompt_tail for text in texts], add_special_tokens=False
+        )["input_ids"]
+        return [self._head_ids + ids for ids in user_ids]
+
+    def _to_device(self, enc) -> Dict[str, torch.Tensor]:
+        """
+        CUDA 면 pinned 버퍼에 복사 후 non_blocking 전송, 아니면 그대로 .to()
+        (버퍼 재사용은 안전: 다음 배치는 이전 generate 결과를 CPU 로 받은 뒤에만 시작)
+        """
+        device = self.model.device
+        if device.type != "cuda":
+            return {k: v.to(device) for k, v in enc.items()}
+
+        out: Dict[str, torch.Tensor] = {}
+        for k, v in enc.items():
+            buf = self._pinned.get(k)
+            if buf is None or buf.dtype != v.dtype or buf.shape[0] < v.shape[0] or buf.shape[1] < v.shape[1]:
+                rows = max(v.shape[0], self.max_batch)
+                cols = max(v.shape[1], buf.shape[1] if buf is not None else 0)
+                buf = torch.empty((rows, cols), dtype=v.dtype, pin_memory=True)
+                self._pinned[k] = buf
+            staged = buf[: v.shape[0], : v.shape[1]]
+            staged.copy_(v)
+            out[k] = staged.to(device, non_blocking=True)
+        return out
+
+    def _generate_batch(self, ids: List[List[int]]) -> List[Dict[str, Any]]:
+        """여러 입력을 (왼쪽) 패딩해서 generate 1회로 처리"""
+        with torch.inference_mode():
+            enc = self._to_device(
+                self.tok.pad({"input_ids": ids}, padding=True, return_tensors="pt")
+            )
+
+            # assisted generate 는 배치 1 만 지원 → 단건 배치일 때만 초안 모델 사용
+            assist = {"assistant_model": self.assistant} if self.assistant is not None and len(ids) == 1 else {}
+
+            out = self.model.generate(
+                **enc,  # input_ids + attention_mask (패딩 위치 제외)
+                **assist,
+                max_new_tokens=self.max_new_tokens,
+                do_sample=False,
+                eos_token_id=self.tok.eos_token_id,
+                pad_token_id=self.tok.pad_token_id,
+                # JSON 이 닫히는 즉시 종료 (max_new_tokens 는 안전 상한으로만 유지)
+                stopping_criteria=StoppingCriteriaList([
+                    _JsonBalanceStop(
+                        self.tok, enc["input_ids"].shape[-1], len(ids), open_level=1 if JSON_PRIME else 0
+                    )
+                ]),
+            )
+
+        # 새로 생성된 토큰만 디코딩 (프롬프트 전체를 다시 디코딩하지 않음)
+        decoded = self.tok.batch_decode(
+            out[:, enc["input_ids"].shape[-1]:], skip_special_tokens=True
+        )
+        # 프롬프트에 넣어 둔 응답 머리를 붙여서 완전한 JSON 으로 파싱
+        return [self._postprocess(_parse_output(JSON_PRIME + d)) for d in decoded]
 
-        try:
-            with self.lock, torch.inference_mode():
-                inputs = self.tok.apply_chat_template(
-                    messages, return_tensors="pt", add_generation_prompt=True
-                ).to(self.model.device)
-
-                out = self.model.generate(
-                    inputs=inputs,
-                    max_new_tokens=self.max_new_tokens,
-                    do_sample=False,
-                    eos_token_id=self.tok.eos_token_id,
-                    pad_token_id=self.tok.eos_token_id,
-                )
-
-                decoded = self.tok.decode(out[0], skip_special_tokens=True)
-
-            parsed = _extract_json(decoded)
-            if not isinstance(parsed, dict):
-                return _default_result()
-
-            # has_sensitive 보정
-            has_sensitive = bool(parsed.get("has_sensitive", False))
-
-            # 엔티티 필터링(허용 라벨만, 값 공백 제거)
-            ents_out: List[Dict[str, str]] = []
-            raw_ents = parsed.get("entities") or []
-            for e in raw_ents:
-                t = str(e.get("type", "")).strip().upper()
-                v = str(e.get("value", "")).strip()
-                if not t or not v:
-                    continue
-                if t not in _ALLOWED:
-                    continue
-                ents_out.append({"type": t, "value": v})
-                # 과도한 엔티티 폭주 방지(안전 상한)
-                if len(ents_out) >= 128:
-                    break
+    @staticmethod
+    def _postprocess(parsed: Any) -> Dict[str, Any]:
+        """JSON 파싱 결과 -> 허용 라벨만 필터링"""
+        if not isinstance(parsed, dict):
+            return _default_result()
 
-            # 모델이 has_sensitive=False인데 실제 엔티티가 있으면 true로 승격
-            if ents_out and not has_sensitive:
-                has_sensitive = True
+        # has_sensitive 보정
+        has_sensitive = bool(parsed.get("has_sensitive", False))
+
+        # 엔티티 필터링(허용 라벨만, 값 공백 제거) — dict 가 아닌 항목은 건너뜀
+        raw_ents = parsed.get("entities") or []
+        if not isinstance(raw_ents, list):
+            raw_ents = []
+        ents_out: List[Dict[str, str]] = list(islice(
+            (
+                {"type": t, "value": v}
+                for e in raw_ents if isinstance(e, dict)
+                for t, v in ((str(e.get("type", "")).strip().upper(), str(e.get("value", "")).strip()),)
+                if v and t in _ALLOWED
+            ),
+            128,  # 과도한 엔티티 폭주 방지(안전 상한)
+        ))
+
+        # 모델이 has_sensitive=False인데 실제 엔티티가 있으면 true로 승격
+        if ents_out and not has_sensitive:
+            has_sensitive = True
+
+        return {"has_sensitive": has_sensitive, "entities": ents_out}
 
-            return {"has_sensitive": has_sensitive, "entities": ents_out}
+    def analyze(self, text: str) -> Dict[str, Any]:
+        """
+        입력 텍스트 -> (배칭 워커) 모델 생성 -> JSON 파싱 -> 허용 라벨만 필터링
+        실패/시간 초과(RESULT_TIMEOUT_S) 시 안전 폴백(_default_result) 반환.
+        """
+        fut = self._submit(text)
+        try:
+            return fut.result(timeout=RESULT_TIMEOUT_S)
+        except Exception:
+            fut.cancel()  # 아직 큐에 있으면 워커가 건너뜀
+            return _default_result()
 
+    async def analyze_async(self, text: str) -> Dict[str, Any]:
+        """analyze 의 async 버전: 이벤트 루프 스레드를 막지 않고 배칭 워커 결과를 await"""
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self._submit(text)), RESULT_TIMEOUT_S)
         except Exception:
-            # 어떤 에러도 500으로 번지지 않도록 폴백
             return _default_result()
 
+    def _submit(self, text: str) -> Future:
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put((text or "", fut))
+        return fut
+
 
 # ---- 글로벌 싱글톤 핸들(서버 부팅 시 1회 초기화)
 _detector_singleton: _Detector | None = None
@@ -203,6 +577,17 @@ def init_from_env() -> None:
       - USE_INTERNAL_DETECTOR: "1"이면 내부 엔진 활성화(기본 0=비활성)
       - MODEL_DIR: 로컬 모델 디렉터리 (필수; 내부 엔진 켰을 때)
       - MAX_NEW_TOKENS: 생성 토큰 수 (기본 256)
+      - DETECTOR_MAX_BATCH / DETECTOR_MAX_WAIT_MS: 동적 배칭 크기/대기시간 (기본 8 / 10ms)
+      - DETECTOR_RESULT_TIMEOUT_S: 요청당 결과 대기 상한, 초과 시 폴백 결과 (기본 60초)
+      - DETECTOR_LENGTH_BINS: 배치를 나눌 사용자 입력 토큰 길이 경계 (기본 "128,512,2048")
+      - DETECTOR_QUANT: "4bit" / "8bit" 가중치 양자화 (기본 끔)
+      - DETECTOR_JSON_PRIME: "1"이면 응답을 '{"has_sensitive":' 로 시작하도록 고정 (기본 1)
+      - DETECTOR_ATTN: 어텐션 구현 "sdpa" / "flash_attention_2" (기본 sdpa, FA2 불가 시 sdpa 로 폴백)
+      - DETECTOR_STATIC_CACHE: "1"이면 사전 할당 StaticCache 재사용 (기본 0)
+      - ASSISTANT_MODEL_DIR: 추측 디코딩용 소형 초안 모델 디렉터리 (선택, 단건 배치에만 적용)
+      - DETECTOR_ASSISTANT_TOKENS: 초안 모델이 한 번에 제안할 토큰 수 (기본 5)
+      - DETECTOR_KV_QUANT: "quanto:4" / "hqq:4" 등 KV 캐시 양자화 (기본 끔, STATIC_CACHE/COMPILE 과 동시 사용 불가)
+      - DETECTOR_COMPILE: "1"이면 StaticCache + torch.compile(reduce-overhead), 부팅 시 워밍업 (기본 0)
     """
     global _detector_singleton
     if _detector_singleton is not None:
@@ -217,7 +602,13 @@ def init_from_env() -> None:
         raise RuntimeError("MODEL_DIR env not set")
 
     max_new = int(os.getenv("MAX_NEW_TOKENS", "256"))
-    _detector_singleton = _Detector(model_dir=model_dir, max_new_tokens=max_new)
+    assistant_dir = os.getenv("ASSISTANT_MODEL_DIR", "").strip() or None
+    _detector_singleton = _Detector(model_dir=model_dir, max_new_tokens=max_new, assistant_dir=assistant_dir)
+
+    if COMPILE:
+        # 첫 실트래픽이 컴파일 대기를 떠안지 않도록 부팅 시 미리 generate (컴파일 + CUDA graph 캡처)
+        for _ in range(2):
+            _detector_singleton.analyze("warmup")
 
 def analyze_text(text: str) -> Dict[str, Any]:
     """
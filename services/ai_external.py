@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 # ai_external.py
 from __future__ import annotations
-import os, json, shlex, re
+import os, re
+from bisect import bisect_left
 from typing import Any, Dict, List, Optional, Tuple
-import subprocess  # nosec B404  # shell=False + 인자리스트만 사용(검증된 입력)
 import time
 
 # Sentinel 내부 모듈 (로컬 LLM 추론용)
@@ -12,46 +12,14 @@ from services import offline_sensitive_detector_min as det_min
 # ---- JSON 추출 유틸 (stdout에 경고/로그가 섞여도 OK) ----
 _CODE_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL | re.IGNORECASE)
 
-def _sanitize(s: str) -> str:
-    return (
-        s.replace("\u2028", "\n")
-         .replace("\u2029", "\n")
-         .replace("\ufeff", "")
-         .strip()
-    )
+# 줄 구분자/BOM 정리는 det_min 의 단일 translate 구현 재사용
+_sanitize = det_min.sanitize_text
 
 def _find_codefence_json(s: str) -> List[str]:
     return [m.group(1).strip() for m in _CODE_FENCE_RE.finditer(s)]
 
-def _find_all_top_level_json(s: str) -> List[str]:
-    blocks: List[str] = []
-    level = 0
-    in_str = False
-    esc = False
-    start = None
-    for i, ch in enumerate(s):
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == "\\":
-                esc = True
-            elif ch == '"':
-                in_str = False
-            continue
-        else:
-            if ch == '"':
-                in_str = True
-                continue
-            if ch == "{":
-                if level == 0:
-                    start = i
-                level += 1
-            elif ch == "}":
-                level -= 1
-                if level == 0 and start is not None:
-                    blocks.append(s[start:i+1].strip())
-                    start = None
-    return blocks
+# 최상위 JSON 블록 수집은 구조 토큰만 훑는 det_min 구현을 그대로 사용
+_find_all_top_level_json = det_min.find_all_top_level_json_blocks
 
 def _find_last_json(s: str) -> Optional[str]:
     s = _sanitize(s)
@@ -61,51 +29,53 @@ def _find_last_json(s: str) -> Optional[str]:
     blocks = _find_all_top_level_json(s)
     if blocks:
         return blocks[-1]
-    # 역방향 복구 (마지막 '}'부터)
-    end = s.rfind("}")
-    if end == -1:
-        return None
-    level = 0
-    in_str = False
-    esc = False
-    for i in range(end, -1, -1):
-        ch = s[i]
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == "\\":
-                esc = True
-            elif ch == '"':
-                in_str = False
-            continue
-        else:
-            if ch == '"':
-                in_str = True
-                continue
-            if ch == "}":
-                level += 1
-            elif ch == "{":
-                level -= 1
-                if level == 0:
-                    return s[i:end+1].strip()
-    return None
+    # 마지막 '}' 기준 복구 (det_min 의 구조 토큰 스캔 재사용)
+    return det_min.find_last_top_level_json_backward(s)
+
+# ---- 엔티티 정리: 문자열 type/value 만, 허용 라벨만 (한 번의 컴프리헨션) ----
+def _clean_entities(ents: Any) -> List[Dict[str, Any]]:
+    if not isinstance(ents, list):
+        return []
+    return [
+        {"type": t, "value": v}
+        for e in ents if isinstance(e, dict)
+        for t, v in ((e.get("type"), e.get("value")),)
+        if isinstance(t, str) and isinstance(v, str)
+        for t, v in ((t.strip().upper(), v.strip()),)
+        if v and t in det_min.ALLOWED_LABELS
+    ]
 
 # ---- 엔티티 스팬 매핑 (왼→오 순서로 값 소비) ----
+def _occurrences(text: str, v: str) -> List[int]:
+    """text 안 v 의 모든 시작 위치(겹침 포함, 오름차순)"""
+    out: List[int] = []
+    i = text.find(v)
+    while i >= 0:
+        out.append(i)
+        i = text.find(v, i + 1)
+    return out
+
 def _add_spans(text: str, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    값마다 출현 위치를 한 번만 수집해 두고 cursor 이후 첫 위치를 bisect 로 찾음
+    (같은 값이 여러 번 나와도 text 를 다시 훑지 않음)
+    """
     out: List[Dict[str, Any]] = []
+    positions: Dict[str, List[int]] = {}
     cursor = 0
     for e in entities:
         v = e.get("value") or ""
         if not isinstance(v, str) or not v:
             continue
-        idx = text.find(v, cursor)
-        if idx < 0:
-            idx = text.find(v, 0)
-            if idx < 0:
-                out.append(dict(e))  # 스팬 없이 통과
-                continue
-        begin = idx
-        end = idx + len(v)
+        pos = positions.get(v)
+        if pos is None:
+            pos = positions[v] = _occurrences(text, v)
+        if not pos:
+            out.append(dict(e))  # 스팬 없이 통과
+            continue
+        k = bisect_left(pos, cursor)
+        begin = pos[k] if k < len(pos) else pos[0]  # cursor 뒤에 없으면 처음 위치로
+        end = begin + len(v)
         cursor = end
         e2 = dict(e)
         e2["begin"] = begin
@@ -167,21 +137,15 @@ def _ensure_model_loaded(model_dir: str) -> Tuple[Any, Any]:
     return tok, model
 
 
-# ---- 서브프로세스 실행기 → 로컬 모델 실행기로 변경 ----
+# ---- 로컬 모델 실행기 (프로세스 내 1회 로드 모델로 직접 추론, 서브프로세스 없음) ----
 class OfflineDetectorRunner:
     def __init__(
         self,
-        script_path: str = os.path.join(os.path.dirname(__file__), "offline_sensitive_detector_min.py"),
         model_dir: Optional[str] = None,
         max_new_tokens: int = 256,
-        timeout_sec: float = 20.0,
-        python_bin: str = "python3",
     ):
-        self.script_path = script_path
         self.model_dir = model_dir or os.environ.get("MODEL_DIR", "")
         self.max_new_tokens = int(os.environ.get("MAX_NEW_TOKENS", max_new_tokens))
-        self.timeout_sec = timeout_sec
-        self.python_bin = python_bin
         if not self.model_dir:
             raise RuntimeError("MODEL_DIR is not set (env or constructor).")
 
@@ -215,16 +179,7 @@ class OfflineDetectorRunner:
         has = bool(parsed.get("has_sensitive"))
         ents = parsed.get("entities") or []
 
-        clean: List[Dict[str, Any]] = []
-        for e in ents:
-            if not isinstance(e, dict):
-                continue
-            t = e.get("type"); v = e.get("value")
-            if isinstance(t, str) and isinstance(v, str):
-                t = t.strip().upper()
-                v = v.strip()
-                if t and v:
-                    clean.append({"type": t, "value": v})
+        clean = _clean_entities(ents)
 
         if return_spans and clean:
             clean = _add_spans(text, clean)
@@ -2,10 +2,19 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 import base64
+import contextlib
+import os
 import re
+import threading
+
+try:
+    import pybase64  # SIMD base64 (선택 의존성)
+except ImportError:  # pragma: no cover
+    pybase64 = None  # type: ignore
 
 from schemas import InItem
 
@@ -26,12 +35,84 @@ _EXT_TO_MIME = {
 }
 
 
+# 파일/폴더명에 허용하지 않는 문자 → '_' (모듈 로드 시 1회 컴파일, bound method 로 호출)
+_UNSAFE_SUB = re.compile(r"[^A-Za-z0-9_.-]").sub
+
+
+@lru_cache(maxsize=1024)
 def _sanitize(s: str) -> str:
+    """공인 IP/호스트명은 같은 값이 반복되므로 결과를 캐시"""
     s = s or "unknown"
     # 윈도우 호환: ':' → '-'
     s = s.replace(":", "-")
     # 나머지 이상한 문자들은 '_'로
-    return re.sub(r"[^A-Za-z0-9_.-]", "_", s)
+    return _UNSAFE_SUB("_", s)
+
+
+def _b64decode(data: str, validate: bool = False) -> bytes:
+    """
+    pybase64 가 있으면 SIMD 디코더 사용
+    (validate=False: 표준 base64 와 동일하게 비알파벳 문자 무시 / True: 알파벳 외 문자면 binascii.Error)
+    """
+    if pybase64 is not None:
+        return pybase64.b64decode(data, validate=validate)
+    return base64.b64decode(data, validate=validate)
+
+
+@lru_cache(maxsize=4096)
+def _ensure_dir(path: Path) -> None:
+    """같은 PC(공인 IP/호스트명) 폴더는 처음 한 번만 mkdir (이후 첨부는 syscall 생략)"""
+    path.mkdir(parents=True, exist_ok=True)
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+# base64 스트리밍 디코딩 단위 (4글자의 배수 → 청크 경계에서 패딩이 깨지지 않음)
+_B64_CHUNK = 64 * 1024
+
+
+_O_BINARY = getattr(os, "O_BINARY", 0)
+
+
+def _write_b64_file(path: Path, data: str) -> None:
+    """
+    base64 를 디코딩해 저수준 fd 로 write. 디코딩 실패 시 기존 파일은 그대로 둔다.
+    - 작은 첨부: 먼저 전부 디코딩한 뒤에야 대상 파일을 연다
+    - 큰 첨부: 같은 폴더의 임시 파일에 64 KiB 청크씩 스트리밍 → 성공 시 os.replace, 실패 시 임시 파일 삭제
+      (디코딩된 파일 전체를 메모리에 한 번에 만들지 않음 → 첨부 크기만큼의 피크 메모리/복사 절감)
+    """
+    if len(data) <= _B64_CHUNK:
+        raw = _b64decode(data)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_BINARY, 0o666)
+        try:
+            _write_all(fd, raw)
+        finally:
+            os.close(fd)
+        return
+
+    tmp = path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.part")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | _O_BINARY, 0o666)
+    try:
+        try:
+            try:
+                for i in range(0, len(data), _B64_CHUNK):
+                    _write_all(fd, _b64decode(data[i:i + _B64_CHUNK], validate=True))
+            except ValueError:  # binascii.Error 포함
+                # 줄바꿈 등 비알파벳 문자가 섞여 4글자 정렬이 깨진 경우: 처음부터 전체 디코딩으로 다시 씀
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                _write_all(fd, _b64decode(data))
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
 
 
 @dataclass
@@ -62,14 +143,19 @@ def save_attachment_file(
         / _sanitize(item.public_ip or "noip")
         / _sanitize(item.hostname or item.pc_name or "noname")
     )
-    subdir.mkdir(parents=True, exist_ok=True)
+    _ensure_dir(subdir)
 
     stem = _sanitize(item.time) or "unknown_time"
     suffix = f".{ext}" if ext else ".bin"
     out_path = subdir / f"{stem}{suffix}"
 
-    raw = base64.b64decode(att.data)
-    out_path.write_bytes(raw)
+    try:
+        _write_b64_file(out_path, att.data)
+    except FileNotFoundError:
+        # 캐시 이후 폴더가 지워진 경우(정리 스크립트 등): 캐시 비우고 다시 생성 후 재시도
+        _ensure_dir.cache_clear()
+        _ensure_dir(subdir)
+        _write_b64_file(out_path, att.data)
 
     return SavedFileInfo(
         ext=ext,
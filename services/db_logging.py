@@ -8,6 +8,11 @@ import logging
 
 from sqlalchemy.orm import Session
 
+try:
+    import pybase64  # SIMD base64 (선택 의존성)
+except ImportError:  # pragma: no cover
+    pybase64 = None  # type: ignore
+
 from schemas import InItem, ServerOut, Entity
 from models import LogRecord, SettingsRecord  # ✅ SettingsRecord 추가
 from services.ocr import OcrService
@@ -28,13 +33,24 @@ from services.files import process_saved_file, redact_saved_file, DOC_EXTS
 
 logger = logging.getLogger(__name__)
 
+# 이 크기 미만은 SIMD 이점보다 호출 오버헤드가 커서 stdlib 사용
+_PYBASE64_MIN_BYTES = 1024
+
+
+def _b64encode_str(raw: bytes) -> str:
+    if pybase64 is not None and len(raw) >= _PYBASE64_MIN_BYTES:
+        return pybase64.b64encode_as_string(raw)
+    return base64.b64encode(raw).decode("ascii")
+
 ADMIN_IMAGE_DIR = Path("./SentinelServer_AI/adminset/image")
 SIMILARITY_THRESHOLD = 0.4  # 이미지 유사도 차단 임계
 
+# 응답 Entity 로 내보낼 수 있는 엔티티 dict 의 필수 키
+_ENTITY_KEYS = frozenset({"value", "begin", "end", "label"})
+
 # 러너 싱글턴 (MODEL_DIR, MAX_NEW_TOKENS는 .env에서 읽힘)
 _DETECTOR = OfflineDetectorRunner(
     model_dir=os.environ.get("MODEL_DIR", "").strip() or None,
-    timeout_sec=20.0,
 )
 
 # =========================
@@ -275,7 +291,7 @@ class DbLoggingService:
         except Exception:
             return None
 
-        data_b64 = base64.b64encode(raw).decode("ascii")
+        data_b64 = _b64encode_str(raw)
         size = len(raw)
 
         attachment_out: Dict[str, Any] = {
@@ -607,9 +623,10 @@ class DbLoggingService:
             host=rec.host,
             modified_prompt=rec.modified_prompt,
             has_sensitive=rec.has_sensitive,
+            # dict 그대로 전달 → ServerOut 검증 1회에 pydantic-core 가 Entity 로 변환 (엔티티별 Entity(**e) 생략)
             entities=[
-                Entity(**e) for e in (rec.entities or [])
-                if isinstance(e, dict) and set(e).issuperset({"value", "begin", "end", "label"})
+                e for e in (rec.entities or [])
+                if isinstance(e, dict) and e.keys() >= _ENTITY_KEYS
             ],
             processing_ms=rec.processing_ms,
             file_blocked=rec.file_blocked,
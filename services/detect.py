@@ -7,7 +7,6 @@ from services.ai_external import OfflineDetectorRunner  # 외부 실행기
 # 싱글턴 러너(.env의 MODEL_DIR/MAX_NEW_TOKENS 사용)
 _DETECTOR = OfflineDetectorRunner(
     model_dir=os.environ.get("MODEL_DIR", "").strip() or None,
-    timeout_sec=20.0,
 )
 
 def _find_spans(text: str, values: List[str]) -> List[Tuple[int, int, str]]:
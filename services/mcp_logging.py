@@ -6,6 +6,7 @@ from typing import Dict, Any, List
 from urllib.parse import urlparse
 import ipaddress
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from models import McpConfigEntry
@@ -108,24 +109,27 @@ class McpLoggingService:
         # 2) 스냅샷 전체 mcp_scope 계산 (행마다 동일하게 들어감)
         mcp_scope = McpLoggingService._calc_mcp_scope(status, server_scopes)
 
-        entries: List[McpConfigEntry] = []
+        # 스냅샷 공통 메타 (행마다 동일)
+        common: Dict[str, Any] = dict(
+            snapshot_id     = snapshot_id,
+            agent_time      = agent_time,
+            public_ip       = public_ip,
+            private_ip      = private_ip,
+            host            = host,
+            pc_name         = pc_name,
+            status          = status,
+            file_path       = file_path,
+            mcp_scope       = mcp_scope,     # 스냅샷 기준 scope
+            config_raw_json = config_raw,
+        )
+
+        rows: List[Dict[str, Any]] = []
 
         # 3) MCP 서버가 하나라도 있으면 서버별로 row 생성
         if servers_data:
             for name, conf, server_type, server_scope in servers_data:
-                entry = McpConfigEntry(
-                    # 스냅샷 공통 메타
-                    snapshot_id     = snapshot_id,
-                    agent_time      = agent_time,
-                    public_ip       = public_ip,
-                    private_ip      = private_ip,
-                    host            = host,
-                    pc_name         = pc_name,
-                    status          = status,
-                    file_path       = file_path,
-                    mcp_scope       = mcp_scope,     # 스냅샷 기준 scope
-                    config_raw_json = config_raw,
-
+                rows.append(dict(
+                    common,
                     # MCP 서버 개별 정보
                     mcp_name     = name,
                     server_type  = server_type,      # 'process' / 'http'
@@ -135,22 +139,11 @@ class McpLoggingService:
                     env_json     = conf.get("env"),
                     url          = conf.get("url"),
                     headers_json = conf.get("headers"),
-                )
-                entries.append(entry)
+                ))
         else:
             # MCP 서버가 없는 스냅샷(예: status=delete 또는 아직 MCP 미사용)
-            entry = McpConfigEntry(
-                snapshot_id     = snapshot_id,
-                agent_time      = agent_time,
-                public_ip       = public_ip,
-                private_ip      = private_ip,
-                host            = host,
-                pc_name         = pc_name,
-                status          = status,
-                file_path       = file_path,
-                mcp_scope       = mcp_scope,
-                config_raw_json = config_raw,
-
+            rows.append(dict(
+                common,
                 mcp_name     = None,
                 server_type  = None,
                 command      = None,
@@ -158,12 +151,10 @@ class McpLoggingService:
                 env_json     = None,
                 url          = None,
                 headers_json = None,
-            )
-            entries.append(entry)
+            ))
 
-        # 4) DB 저장
-        db.add_all(entries)
-        db.flush()
+        # 4) DB 저장: ORM 객체 생성 없이 한 번의 executemany INSERT
+        db.execute(insert(McpConfigEntry), rows)
 
         return McpInResponse(
             snapshot_id=snapshot_id,
@@ -12,7 +12,7 @@
 python offline_sensitive_detector_min.py --model_dir /root/runs/qwen3b_sft_merged --text "연락처 010-1234-5678"
 python offline_sensitive_detector_min.py --model_dir /root/runs/qwen3b_sft_merged --input samples.txt --limit 0
 """
-import os, sys, json, argparse, re
+import os, sys, json, argparse, re, copy
 from typing import Optional, Dict, Any, List
 
 # -------- 오프라인 강제 --------
@@ -20,8 +20,9 @@ os.environ.setdefault("HF_HUB_OFFLINE", "1")
 os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
 os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
 
+import orjson
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, AutoModelForCausalLM, DynamicCache
 
 # ------------------------------- 시스템 프롬프트 -------------------------------
 SYS_PROMPT = (
@@ -60,16 +61,24 @@ SYS_PROMPT = (
     """
 ).strip()
 
+# 프롬프트의 ALLOWED LABELS 와 동일 (모델이 지어낸 라벨은 후처리에서 버림)
+ALLOWED_LABELS = frozenset({
+    "NAME", "PHONE", "EMAIL", "ADDRESS", "POSTAL_CODE",
+    "PERSONAL_CUSTOMS_ID", "RESIDENT_ID", "PASSPORT", "DRIVER_LICENSE", "FOREIGNER_ID", "HEALTH_INSURANCE_ID", "BUSINESS_ID", "MILITARY_ID",
+    "JWT", "API_KEY", "GITHUB_PAT", "PRIVATE_KEY",
+    "CARD_NUMBER", "CARD_EXPIRY", "BANK_ACCOUNT", "CARD_CVV", "PAYMENT_PIN", "MOBILE_PAYMENT_PIN",
+    "MNEMONIC", "CRYPTO_PRIVATE_KEY", "HD_WALLET", "PAYMENT_URI_QR",
+    "IPV4", "IPV6", "MAC_ADDRESS", "IMEI",
+})
+
 # --------- JSON 추출 유틸 ---------
 CODE_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL | re.IGNORECASE)
 
+# 줄 구분자(U+2028/2029) → 개행, BOM 제거를 한 번의 translate 로 처리
+SANITIZE_TABLE = str.maketrans({"\u2028": "\n", "\u2029": "\n", "\ufeff": None})
+
 def sanitize_text(s: str) -> str:
-    return (
-        s.replace("\u2028", "\n")
-         .replace("\u2029", "\n")
-         .replace("\ufeff", "")
-         .strip()
-    )
+    return s.translate(SANITIZE_TABLE).strip()
 
 def strip_role_headers_shallow(s: str) -> str:
     s = s.lstrip()
@@ -81,50 +90,55 @@ def strip_role_headers_shallow(s: str) -> str:
 def find_codefence_json_blocks(s: str) -> List[str]:
     return [m.group(1).strip() for m in CODE_FENCE_RE.finditer(s)]
 
+# JSON 구조 토큰: 문자열 리터럴(이스케이프 포함, 미종결이면 끝까지 — 끝의 외톨이 역슬래시 포함) 통째로 / 중괄호
+JSON_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*(?:"|\\?\Z)|[{}]', re.DOTALL)
+
 def find_all_top_level_json_blocks(s: str) -> List[str]:
-    """문자열 내 최상위 { ... } 블록 '모두' 수집 (문자열/이스케이프 인식)"""
+    """
+    문자열 내 최상위 { ... } 블록 '모두' 수집 (문자열/이스케이프 인식)
+    글자 단위 루프 대신 정규식이 문자열/중괄호 토큰만 넘겨주므로 파이썬 루프는 구조 문자 수만큼만 돈다.
+    """
     blocks = []
-    first = s.find("{")
-    if first == -1:
+    if "{" not in s:
         return blocks
     level = 0
-    in_str = False
-    esc = False
     start_idx = None
-    for i, ch in enumerate(s):
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == "\\":
-                esc = True
-            elif ch == '"':
-                in_str = False
-            continue
-        else:
-            if ch == '"':
-                in_str = True
-                continue
-            if ch == "{":
-                if level == 0:
-                    start_idx = i
-                level += 1
-            elif ch == "}":
-                level -= 1
-                if level == 0 and start_idx is not None:
-                    blocks.append(s[start_idx:i+1].strip())
-                    start_idx = None
+    for m in JSON_TOKEN_RE.finditer(s):
+        tok = m.group()
+        if tok == "{":
+            if level == 0:
+                start_idx = m.start()
+            level += 1
+        elif tok == "}":
+            level -= 1
+            if level == 0 and start_idx is not None:
+                blocks.append(s[start_idx:m.end()].strip())
+                start_idx = None
     return blocks
 
+# 역방향 복구용 구조 문자 (문자열 따옴표 / 이스케이프 / 중괄호)
+JSON_STRUCT_RE = re.compile(r'[{}"\\]')
+
 def find_last_top_level_json_backward(s: str) -> Optional[str]:
-    """마지막 '}'부터 역방향으로 매칭해 마지막 최상위 JSON 블록을 복원 (백업용)"""
+    """
+    마지막 '}'부터 역방향으로 매칭해 마지막 최상위 JSON 블록을 복원 (백업용)
+    역방향 문자열 상태 추적은 그대로 두고, 뒤집은 문자열에서 구조 문자만 정규식으로 건너뛰며 처리
+    (JSON 앞에 짝 안 맞는 따옴표가 있어도 복구되는 기존 동작 유지)
+    """
     end = s.rfind("}")
     if end == -1:
         return None
+    rev = s[end::-1]
     level = 0
     in_str = False
     esc = False
-    for i in range(end, -1, -1):
-        ch = s[i]
+    last = -1
+    for m in JSON_STRUCT_RE.finditer(rev):
+        j = m.start()
+        if esc and j != last + 1:
+            esc = False  # 사이에 일반 문자가 있었음 → 그 문자가 이스케이프를 소비
+        last = j
+        ch = rev[j]
         if in_str:
             if esc:
                 esc = False
@@ -133,16 +147,15 @@ def find_last_top_level_json_backward(s: str) -> Optional[str]:
             elif ch == '"':
                 in_str = False
             continue
-        else:
-            if ch == '"':
-                in_str = True
-                continue
-            if ch == "}":
-                level += 1
-            elif ch == "{":
-                level -= 1
-                if level == 0:
-                    return s[i:end+1].strip()
+        if ch == '"':
+            in_str = True
+            continue
+        if ch == "}":
+            level += 1
+        elif ch == "{":
+            level -= 1
+            if level == 0:
+                return s[end - j:end + 1].strip()
     return None
 
 def extract_best_json(s: str) -> Optional[str]:
@@ -174,25 +187,89 @@ def build_prompt(user_text: str) -> str:
     )
     return prompt
 
-def run_infer(tok, model, text: str, max_new_tokens: int = 256) -> Dict[str, Any]:
+# 프롬프트 고정 앞부분(SYS_PROMPT + "User:") → 토크나이저별로 1회만 토크나이즈해서 재사용
+PROMPT_HEAD = SYS_PROMPT + "\n\nUser:"
+_HEAD_IDS: Dict[int, Optional[List[int]]] = {}
+
+def prompt_head_ids(tok) -> Optional[List[int]]:
+    """
+    앞부분 토큰 id (BOS 등 특수 토큰 포함). 나눠서 토크나이즈한 결과가
+    통째로 토크나이즈한 결과와 다르면(경계에서 병합되는 토크나이저) None → 기존 방식 사용
+    """
+    key = id(tok)
+    if key not in _HEAD_IDS:
+        head = tok(PROMPT_HEAD)["input_ids"]
+        probe = build_prompt("probe: user text 123")
+        tail = tok(probe[len(PROMPT_HEAD):], add_special_tokens=False)["input_ids"]
+        _HEAD_IDS[key] = head if head + tail == tok(probe)["input_ids"] else None
+    return _HEAD_IDS[key]
+
+def encode_prompt(tok, text: str) -> Dict[str, Any]:
+    """프롬프트 토크나이즈: 사용자 입력 구간만 매번 토크나이즈하고 캐시된 앞부분 id 앞에 붙임"""
     prompt = build_prompt(text)
-    inputs = tok(prompt, return_tensors="pt").to(model.device)
+    head = prompt_head_ids(tok)
+    if head is None:
+        return tok(prompt, return_tensors="pt")
+    tail = tok(prompt[len(PROMPT_HEAD):], add_special_tokens=False)["input_ids"]
+    input_ids = torch.tensor([head + tail], dtype=torch.long)
+    return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+
+# 프롬프트 앞부분 KV 캐시 재사용 (기본 켬, "0" 이면 끔)
+PREFIX_CACHE = os.getenv("DETECTOR_PREFIX_CACHE", "1") == "1"
+_HEAD_KV: Dict[int, Any] = {}  # id(model) → 앞부분 prefill 결과 (사용 불가면 None)
+
+def prompt_head_cache(tok, model) -> Optional[Any]:
+    """고정 앞부분을 모델별로 1회만 prefill 해 둔 KV 캐시 (요청마다 deepcopy 해서 이어 생성)"""
+    key = id(model)
+    if key not in _HEAD_KV:
+        head = prompt_head_ids(tok) if PREFIX_CACHE else None
+        kv = None
+        if head is not None:
+            try:
+                ids = torch.tensor([head], dtype=torch.long, device=model.device)
+                with torch.no_grad():
+                    kv = model(input_ids=ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
+            except Exception:
+                kv = None
+        _HEAD_KV[key] = kv
+    return _HEAD_KV[key]
+
+def run_infer(tok, model, text: str, max_new_tokens: int = 256) -> Dict[str, Any]:
+    inputs = {k: v.to(model.device) for k, v in encode_prompt(tok, text).items()}
+    gen_kwargs = dict(
+        max_new_tokens=max_new_tokens,
+        do_sample=False,
+        eos_token_id=tok.eos_token_id,
+    )
 
     with torch.no_grad():
-        out = model.generate(
-            **inputs,
-            max_new_tokens=max_new_tokens,
-            do_sample=False,
-            eos_token_id=tok.eos_token_id,
-        )
-
-    # 생성 텍스트 디코딩 (프롬프트 포함일 수 있으므로 JSON 추출기 사용)
-    full_text = tok.decode(out[0], skip_special_tokens=True)
-    json_candidate = extract_best_json(full_text)
-    if json_candidate is None:
-        return {"has_sensitive": False, "entities": []}
+        head_kv = prompt_head_cache(tok, model)
+        out = None
+        if head_kv is not None:
+            # 앞부분은 캐시에 있으므로 generate 는 사용자 입력 구간만 prefill
+            try:
+                out = model.generate(**inputs, past_key_values=copy.deepcopy(head_kv), **gen_kwargs)
+            except Exception:
+                _HEAD_KV[id(model)] = None  # 캐시 이어 생성을 지원하지 않는 모델 → 이후엔 일반 경로
+        if out is None:
+            out = model.generate(**inputs, **gen_kwargs)
+
+    # 새로 생성된 토큰만 디코딩 (프롬프트는 다시 디코딩하지 않음)
+    gen_text = tok.decode(out[0, inputs["input_ids"].shape[-1]:], skip_special_tokens=True).strip()
+
+    # 생성분이 JSON 그 자체면 바로 파싱, 아니면 JSON 추출기로 복구
+    parsed = None
+    if gen_text.startswith("{") and gen_text.endswith("}"):
+        try:
+            parsed = orjson.loads(gen_text)
+        except orjson.JSONDecodeError:
+            parsed = None
     try:
-        parsed = json.loads(json_candidate)
+        if parsed is None:
+            json_candidate = extract_best_json(gen_text)
+            if json_candidate is None:
+                return {"has_sensitive": False, "entities": []}
+            parsed = orjson.loads(json_candidate)
         if not isinstance(parsed, dict):
             raise ValueError("not a dict")
         if "has_sensitive" not in parsed or "entities" not in parsed:
@@ -80,12 +80,24 @@ def _build_reason_prompt(context_logs: List[LogRecord], risk_info: Dict[str, Any
     return "\n".join(lines)
 
 
+# greedy(do_sample=False) 라 같은 프롬프트는 결과가 같으므로 프롬프트 단위로 캐시
+# (같은 PC 를 다시 조회하거나 동일 컨텍스트가 반복될 때 generate 생략, 반환 dict 는 수정 금지)
+# 파싱에 성공한 결과만 저장 → MODEL_DIR 미설정/파싱 실패 등은 다음 호출에서 다시 시도
+_LLM_CACHE_MAX = 256
+_LLM_CACHE: Dict[str, Dict[str, Any]] = {}
+
+
 def _run_llm(prompt: str) -> Dict[str, Any]:
     """
     공통 LLM 호출 로직:
     - ai_external._ensure_model_loaded() 로 탐지 모델과 같은 인스턴스를 재사용
     - offline_sensitive_detector_min.extract_best_json() 재사용
+    - 성공한 결과는 _LLM_CACHE 에서 바로 반환
     """
+    cached = _LLM_CACHE.get(prompt)
+    if cached is not None:
+        return cached
+
     if not MODEL_DIR:
         return {"intent_type": "unknown", "reason": "MODEL_DIR가 설정되지 않았습니다."}
 
@@ -115,10 +127,15 @@ def _run_llm(prompt: str) -> Dict[str, Any]:
             it = "unknown"
         if not isinstance(rs, str) or not rs.strip():
             rs = "LLM 판단 결과를 해석할 수 없습니다."
-        return {"intent_type": it, "reason": rs.strip()}
+        result = {"intent_type": it, "reason": rs.strip()}
     except Exception:
         return {"intent_type": "unknown", "reason": "LLM JSON 응답 파싱 실패"}
 
+    if len(_LLM_CACHE) >= _LLM_CACHE_MAX:
+        _LLM_CACHE.pop(next(iter(_LLM_CACHE)), None)  # 가장 먼저 넣은 항목부터 제거
+    _LLM_CACHE[prompt] = result
+    return result
+
 
 def infer_intent_with_llm(
     context_logs: List[LogRecord],
@@ -32,7 +32,10 @@ ExecStartPre=/usr/bin/test -r ${CERT_FULLCHAIN}
 ExecStartPre=/usr/bin/test -r ${CERT_PRIVKEY}
 
 # uvicorn HTTPS
+# - uvloop / httptools 명시 (requirements 에 고정, 누락 시 asyncio/h11 로 조용히 폴백하지 않도록)
+# - 워커는 1개 유지: 내부 탐지 모델·설정 캐시가 프로세스 단위라 워커를 늘리면 모델이 워커 수만큼 중복 로드됨
 ExecStart=${APP_DST}/.venv/bin/python3 -m uvicorn app:app --host 0.0.0.0 --port 443 \
+  --loop uvloop --http httptools --backlog 4096 \
   --ssl-certfile ${CERT_FULLCHAIN} \
   --ssl-keyfile  ${CERT_PRIVKEY}
 
@@ -0,0 +1,42 @@
+# tests/test_db_init.py
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _run_init_twice(db_path: Path) -> subprocess.CompletedProcess:
+    # 설정/엔진이 모듈 import 시점에 고정되므로 별도 프로세스에서 빈 SQLite 파일로 실행
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path.as_posix()}")
+    return subprocess.run(
+        [sys.executable, "-c", "import db; db.init_db(); db.init_db()"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+
+
+def test_init_db_twice_on_empty_sqlite(tmp_path):
+    db_path = tmp_path / "sentinel.db"
+    first = _run_init_twice(db_path)
+    assert first.returncode == 0, first.stderr
+    # 재시작(새 프로세스)에서도 기존 인덱스를 다시 만들지 않아야 함
+    second = _run_init_twice(db_path)
+    assert second.returncode == 0, second.stderr
+
+
+def test_json_serializer_escapes_like_stdlib():
+    # 기존 행(json.dumps 기본 ensure_ascii)과 같은 이스케이프 → 한글 값 LIKE 검색이 신/구 행에서 동일
+    pytest.importorskip("orjson")
+    import json
+
+    import db
+
+    for value in ["홍길동", "010-1234-5678", "emoji 😀", "del \x7f", 'quote " \\ \n']:
+        obj = [{"label": "NAME", "value": value}]
+        assert db._json_dumps(obj) == json.dumps(obj, separators=(",", ":"))
@@ -0,0 +1,113 @@
+# tests/test_json_extract.py
+import random
+
+import pytest
+
+pytest.importorskip("orjson")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from services import offline_sensitive_detector_min as det_min  # noqa: E402
+
+
+def _ref_last_backward(s):
+    # 기존 문자 단위 역방향 스캔 (기준 구현)
+    end = s.rfind("}")
+    if end == -1:
+        return None
+    level = 0
+    in_str = False
+    esc = False
+    for i in range(end, -1, -1):
+        ch = s[i]
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+            continue
+        if ch == "}":
+            level += 1
+        elif ch == "{":
+            level -= 1
+            if level == 0:
+                return s[i:end + 1].strip()
+    return None
+
+
+def _ref_all_blocks(s):
+    # 기존 문자 단위 정방향 스캔 (기준 구현)
+    blocks = []
+    if "{" not in s:
+        return blocks
+    level = 0
+    in_str = False
+    esc = False
+    start_idx = None
+    for i, ch in enumerate(s):
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+            continue
+        if ch == "{":
+            if level == 0:
+                start_idx = i
+            level += 1
+        elif ch == "}":
+            level -= 1
+            if level == 0 and start_idx is not None:
+                blocks.append(s[start_idx:i + 1].strip())
+                start_idx = None
+    return blocks
+
+
+STRAY_QUOTE_CASES = [
+    'He said "hi\n{"has_sensitive": true, "entities": [{"type":"PHONE","value":"010-1234-5678"}]}',
+    '"{"has_sensitive": false, "entities": []}',
+    'note: "unterminated {"a": "}"} tail',
+]
+
+
+@pytest.mark.parametrize("text", STRAY_QUOTE_CASES)
+def test_last_backward_stray_leading_quote(text):
+    got = det_min.find_last_top_level_json_backward(text)
+    assert got is not None
+    assert got == _ref_last_backward(text)
+
+
+def test_last_backward_matches_reference_fuzz():
+    rnd = random.Random(7)
+    alpha = '{}"\\ab:,'
+    for _ in range(20000):
+        s = "".join(rnd.choice(alpha) for _ in range(rnd.randint(0, 16)))
+        assert det_min.find_last_top_level_json_backward(s) == _ref_last_backward(s), repr(s)
+
+
+@pytest.mark.parametrize("text", [
+    '{"value":"}\\',
+    '{"value":"}\\\n',
+    '{"a":"x\\"}"}',
+    '{"a":1} {"b":"\\\\"}',
+])
+def test_all_blocks_unterminated_escape(text):
+    assert det_min.find_all_top_level_json_blocks(text) == _ref_all_blocks(text)
+
+
+def test_all_blocks_matches_reference_fuzz():
+    rnd = random.Random(11)
+    alpha = '{}"\\a\n'
+    for _ in range(20000):
+        s = "".join(rnd.choice(alpha) for _ in range(rnd.randint(0, 16)))
+        assert det_min.find_all_top_level_json_blocks(s) == _ref_all_blocks(s), repr(s)